@@ -0,0 +1,114 @@
+import os
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Coroutine
+import logging
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 동기 API가 공유하는 백그라운드 이벤트 루프
+# (비동기 모델 클라이언트는 처음 사용한 루프에 묶이므로 호출마다 새 루프를 만들지 않음)
+_loop = None
+_loop_lock = threading.Lock()
+
+# 블로킹 작업용 스레드 풀 (질의 경로와 인제스트를 분리해 큰 업로드가 질의를 굶기지 않도록 함)
+_executors = {}
+_executors_lock = threading.Lock()
+
+# 인라인 실행 여부 (프로파일링 중인 호출은 모든 처리를 호출한 스레드에서 수행해야 프로파일에 나타남)
+_inline = contextvars.ContextVar("rag_inline_execution", default=False)
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """백그라운드 이벤트 루프 반환 (처음 호출 시 데몬 스레드에서 시작)"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="rag-event-loop", daemon=True)
+                thread.start()
+                _loop = loop
+                logger.info("백그라운드 이벤트 루프 시작")
+    return _loop
+
+@contextmanager
+def inline_execution():
+    """
+    with 블록 안의 동기 API 호출을 현재 스레드의 전용 이벤트 루프에서 실행
+
+    CPU 작업(추출, 청킹, 검색)은 스레드 풀 대신 현재 스레드에서, 모델 호출은 공유 루프에 묶인
+    비동기 클라이언트 대신 동기 메서드로 수행 (cProfile 등 스레드 단위 프로파일러용)
+    """
+    token = _inline.set(True)
+    try:
+        yield
+    finally:
+        _inline.reset(token)
+
+def is_inline() -> bool:
+    """현재 코루틴이 inline_execution() 안에서 실행 중인지 여부"""
+    return _inline.get()
+
+def _get_executor(name: str) -> ThreadPoolExecutor:
+    """
+    이름별 공유 스레드 풀 반환 (처음 호출 시 생성)
+
+    query: 질의 경로의 컬렉션 로드, 검색, 클라이언트 생성 (asyncio 기본 스레드 풀과 같은 크기)
+    ingest: 해시 계산, 텍스트 추출, 청킹, 인덱스 저장 (INGEST_WORKERS, 기본값: CPU 수의 절반, 최소 2)
+    """
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                cpus = os.cpu_count() or 4
+                if name == "ingest":
+                    max_workers = int(os.getenv('INGEST_WORKERS', 0)) or max(2, cpus // 2)
+                else:
+                    max_workers = min(32, cpus + 4)
+                executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"rag-{name}")
+                _executors[name] = executor
+    return executor
+
+async def _run_in(name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """func를 이름별 스레드 풀에서 실행 (인라인 실행 중이면 현재 스레드에서 바로 실행)"""
+    if _inline.get():
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(name), call)
+
+async def offload(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """질의 경로의 CPU/블로킹 작업을 질의용 스레드 풀에서 실행"""
+    return await _run_in("query", func, *args, **kwargs)
+
+async def offload_ingest(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """문서 인제스트의 CPU/블로킹 작업을 크기가 제한된 인제스트 전용 스레드 풀에서 실행"""
+    return await _run_in("ingest", func, *args, **kwargs)
+
+def run_sync(coro: Coroutine) -> Any:
+    """
+    코루틴을 백그라운드 이벤트 루프에서 실행하고 결과를 기다림 (동기 API용)
+
+    Args:
+        coro: 실행할 코루틴
+
+    Returns:
+        코루틴의 반환값
+    """
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is not None:
+        coro.close()
+        raise RuntimeError("이벤트 루프 안에서는 동기 API 대신 a* 코루틴을 await 하세요.")
+    if _inline.get():
+        # 현재 컨텍스트(인라인 플래그 포함)를 물려받는 전용 루프에서 실행
+        return asyncio.run(coro)
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
@@ -0,0 +1,125 @@
+import time
+import asyncio
+import argparse
+import tempfile
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from rag_system import RAGSystem
+from model_scheduler import ModelScheduler
+from fake_providers import install_fake_providers
+from async_runner import get_loop
+
+
+class ThreadSampler:
+    """측정 구간 동안 살아 있는 스레드 수의 최댓값 기록"""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def build_rag(db_path: str, args) -> RAGSystem:
+    """가짜 모델과 합성 문서로 채운 RAGSystem 생성 (스케줄러는 측정을 제한하지 않도록 넉넉하게)"""
+    limit = max(args.concurrency)
+    scheduler = ModelScheduler({"llm": limit, "embedding": limit}, max_queue=args.requests)
+    rag = RAGSystem(chunk_size=200, chunk_overlap=20, db_path=db_path, scheduler=scheduler)
+    install_fake_providers(rag, embed_latency=args.embed_latency, llm_latency=args.llm_latency,
+                           offline_tokenizer=True)
+    for i in range(args.docs):
+        path = f"{db_path}/doc{i}.txt"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(" ".join(f"문서{i} 단어{j}" for j in range(2000)))
+        rag.add_document(path)
+    return rag
+
+
+def run_sync_api(rag: RAGSystem, questions, concurrency: int, max_threads: int, k: int):
+    """동기 query()를 스레드 풀에서 호출 (스레드 기반 서버의 요청 처리 흉내)"""
+    def timed(question):
+        start = time.perf_counter()
+        result = rag.query(question, k=k)
+        return time.perf_counter() - start, result["status"]
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, max_threads)) as pool:
+        return list(pool.map(timed, questions))
+
+
+def run_async_api(rag: RAGSystem, questions, concurrency: int, k: int):
+    """
+    aquery()를 동시에 최대 concurrency개 실행
+
+    비동기 모델 클라이언트는 처음 사용한 이벤트 루프에 묶이므로, 시딩과 동기 API가 쓰는
+    공유 이벤트 루프에서 실행 (실제 클라이언트로 바꿔도 같은 조건)
+    """
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(question):
+            async with semaphore:
+                start = time.perf_counter()
+                result = await rag.aquery(question, k=k)
+                return time.perf_counter() - start, result["status"]
+
+        return await asyncio.gather(*(timed(q) for q in questions))
+
+    return asyncio.run_coroutine_threadsafe(main(), get_loop()).result()
+
+
+def report(mode: str, concurrency: int, elapsed: float, results, peak_threads: int):
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    errors = sum(status != "success" for _, status in results)
+    p95 = latencies[max(0, int(len(latencies) * 0.95 + 0.5) - 1)]
+    print(f"{mode:<5} 동시성 {concurrency:>4}: 처리량 {len(results) / elapsed:8.1f} req/s  "
+          f"중앙값 {statistics.median(latencies):8.1f} ms  p95 {p95:8.1f} ms  "
+          f"최대 스레드 {peak_threads:>4}  오류 {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동기(스레드) API와 asyncio API의 동시성 확장성 비교")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32, 128], help="측정할 동시 요청 수")
+    parser.add_argument('--requests', type=int, default=256, help="동시성 단계별 요청 수")
+    parser.add_argument('--max-threads', type=int, default=32, help="동기 API 스레드 풀 최대 크기 (서버 워커 수)")
+    parser.add_argument('--embed-latency', type=float, default=0.05, help="가짜 임베딩 호출 지연 시간 (초)")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="가짜 LLM 호출 지연 시간 (초)")
+    parser.add_argument('--docs', type=int, default=4, help="인덱싱할 합성 문서 수")
+    parser.add_argument('--k', type=int, default=5, help="검색할 문서 수")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as db_path:
+        rag = build_rag(db_path, args)
+        print(f"=== 비동기 API 벤치마크 (요청 {args.requests}개/단계, 임베딩 {args.embed_latency}s, "
+              f"LLM {args.llm_latency}s, 동기 스레드 최대 {args.max_threads}개) ===")
+        for concurrency in args.concurrency:
+            # 질문마다 다른 문장으로 만들어 질의 합치기가 측정에 끼어들지 않게 함
+            for mode in ("sync", "async"):
+                questions = [f"{mode} {concurrency} 질문 {i}" for i in range(args.requests)]
+                with ThreadSampler() as sampler:
+                    start = time.perf_counter()
+                    if mode == "sync":
+                        results = run_sync_api(rag, questions, concurrency, args.max_threads, args.k)
+                    else:
+                        results = run_async_api(rag, questions, concurrency, args.k)
+                    elapsed = time.perf_counter() - start
+                report(mode, concurrency, elapsed, results, sampler.peak)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import time
+import argparse
+import tempfile
+import statistics
+import numpy as np
+from langchain.schema import Document
+from vector_store import VectorStore
+from profiling import profiled, PROFILE_FORMATS
+
+
+def build_store(db_path: str, vectors: np.ndarray, num_shards: int) -> VectorStore:
+    """무작위 벡터로 채운 VectorStore 생성"""
+    store = VectorStore(db_path, num_shards=num_shards)
+    documents = [Document(page_content=f"chunk {i}", metadata={"chunk_id": i})
+                 for i in range(len(vectors))]
+    store.add_documents(documents, vectors)
+    return store
+
+
+def measure(store: VectorStore, queries: np.ndarray, k: int):
+    """쿼리별 검색 지연 시간(ms)과 결과 청크 id 목록 반환"""
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        _, metadata_list, _ = store.search(query, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([m["chunk_id"] for m in metadata_list])
+    return latencies, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="VectorStore 샤드 수별 검색 성능 벤치마크")
+    parser.add_argument('--num-vectors', type=int, default=100000, help="인덱스 벡터 수")
+    parser.add_argument('--num-queries', type=int, default=200, help="쿼리 수")
+    parser.add_argument('--k', type=int, default=5, help="검색할 문서 수")
+    parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4, 8], help="측정할 샤드 수")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profile', choices=PROFILE_FORMATS, help="샤드 수별 검색 구간 프로파일 저장")
+    args = parser.parse_args()
+
+    import logging
+    logging.getLogger('vector_store').setLevel(logging.WARNING)
+
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.standard_normal((args.num_vectors, 768)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = rng.standard_normal((args.num_queries, 768)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    print(f"=== 샤드 검색 벤치마크 (벡터 {args.num_vectors}개, 쿼리 {args.num_queries}개, k={args.k}) ===")
+    baseline = None
+    for num_shards in args.shards:
+        with tempfile.TemporaryDirectory() as db_path:
+            store = build_store(db_path, vectors, num_shards)
+            store.search(queries[0], args.k)  # 스레드 풀 워밍업
+            if args.profile:
+                with profiled(f"search-{num_shards}shards", args.profile) as info:
+                    latencies, results = measure(store, queries, args.k)
+                print(f"프로파일 저장: {info['path']}")
+            else:
+                latencies, results = measure(store, queries, args.k)
+
+        if baseline is None:
+            baseline = (statistics.median(latencies), results)
+        same = sum(r == b for r, b in zip(results, baseline[1])) / len(results)
+        p95 = statistics.quantiles(latencies, n=20)[18]
+        print(f"샤드 {num_shards:>2}: 중앙값 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms  "
+              f"속도 향상 x{baseline[0] / statistics.median(latencies):.2f}  "
+              f"결과 일치율 {same * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+from profiling import PROFILE_FORMATS
+
+# 각 측정은 새 프로세스에서 수행 (import 캐시가 없는 콜드 스타트 상태)
+CHILD_CODE = r'''
+import os, sys, time, json
+from contextlib import nullcontext
+from profiling import profiled
+profile = profiled("startup", sys.argv[2]) if sys.argv[2] else nullcontext({})
+profile_info = profile.__enter__()
+t0 = time.perf_counter()
+import flask_app
+t_import = time.perf_counter() - t0
+heavy = ['langchain', 'langchain_google_genai', 'faiss', 'pdfplumber', 'tiktoken']
+heavy_loaded = [m for m in heavy if m in sys.modules]
+
+client = flask_app.app.test_client()
+client.get('/api/health')
+t_health = time.perf_counter() - t0
+
+while client.get('/api/ready').status_code != 200:
+    time.sleep(0.001)
+t_ready = time.perf_counter() - t0
+
+if os.getenv('GOOGLE_API_KEY'):
+    mode = 'query'
+else:
+    # API 키가 없으면 가짜 모델로 교체해 네트워크 없이 첫 /api/query 전체 경로를 측정
+    from fake_providers import install_fake_providers
+    install_fake_providers(flask_app.rag, offline_tokenizer=True)
+    mode = 'query (가짜 모델)'
+resp = client.post('/api/query', json={'question': sys.argv[1]})
+assert resp.status_code == 200, resp.get_data(as_text=True)
+t_first = time.perf_counter() - t0
+profile.__exit__(None, None, None)
+
+print(json.dumps({
+    'import': t_import,
+    'health': t_health,
+    'ready': t_ready,
+    'first': t_first,
+    'mode': mode,
+    'heavy_loaded_at_import': heavy_loaded,
+    'profile': profile_info.get('path'),
+}))
+'''
+
+
+def run_once(question: str, warmup: bool, profile: str = '') -> dict:
+    """새 프로세스에서 한 번의 콜드 스타트를 측정"""
+    env = dict(os.environ, RAG_WARMUP='1' if warmup else '0')
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD_CODE, question, profile],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="flask_app 콜드 스타트 벤치마크")
+    parser.add_argument('--runs', type=int, default=5, help="반복 횟수")
+    parser.add_argument('--question', default="이 문서의 요약을 알려주세요.", help="첫 질문")
+    parser.add_argument('--no-warmup', action='store_true', help="백그라운드 워밍업 없이 측정")
+    parser.add_argument('--profile', choices=PROFILE_FORMATS, help="각 실행의 시작~첫 질의 구간 프로파일 저장")
+    args = parser.parse_args()
+
+    results = [run_once(args.question, not args.no_warmup, args.profile or '') for _ in range(args.runs)]
+
+    print(f"=== 콜드 스타트 ({args.runs}회, warmup={'off' if args.no_warmup else 'on'}, "
+          f"첫 요청={results[0]['mode']}) ===")
+    for key, label in [('import', 'import flask_app'),
+                       ('health', '/api/health 응답'),
+                       ('ready', '/api/ready 200'),
+                       ('first', '첫 질의 완료')]:
+        values = [r[key] * 1000 for r in results]
+        print(f"{label:<20} 중앙값 {statistics.median(values):8.1f} ms  "
+              f"(최소 {min(values):.1f} / 최대 {max(values):.1f})")
+    print(f"import 시점에 로드된 무거운 모듈: {results[0]['heavy_loaded_at_import'] or '없음'}")
+    for result in results:
+        if result['profile']:
+            print(f"프로파일 저장: {result['profile']}")
+
+
+if __name__ == '__main__':
+    main()
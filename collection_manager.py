@@ -0,0 +1,219 @@
+import os
+import re
+import threading
+import weakref
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+from vector_store import VectorStore
+import logging
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTION = "default"
+_COLLECTION_NAME_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def validate_collection_name(name: Optional[str]) -> str:
+    """
+    컬렉션 이름 검증
+
+    Args:
+        name: 컬렉션 이름 (None이나 빈 문자열은 default 컬렉션)
+
+    Returns:
+        정규화된 컬렉션 이름
+    """
+    if not name:
+        return DEFAULT_COLLECTION
+    if not _COLLECTION_NAME_RE.match(name):
+        raise ValueError(f"잘못된 컬렉션 이름: {name} (영문, 숫자, '_', '-' 64자 이내)")
+    return name
+
+class CollectionNotFound(LookupError):
+    """존재하지 않는 컬렉션 (업로드만 새 컬렉션을 만들 수 있음)"""
+
+    def __init__(self, name: str):
+        super().__init__(f"컬렉션을 찾을 수 없습니다: {name}")
+        self.name = name
+
+class CollectionManager:
+    """컬렉션(테넌트)별 VectorStore를 관리하고 메모리 예산 내에서 LRU로 상주시키는 클래스"""
+
+    def __init__(self, db_path: str = "./vector_db", max_memory_mb: Optional[float] = None,
+                 num_shards: int = 1):
+        """
+        CollectionManager 초기화
+
+        Args:
+            db_path: 벡터 DB 루트 경로 (default 컬렉션은 루트, 나머지는 collections/<이름>)
+            max_memory_mb: 메모리에 상주시킬 컬렉션들의 총 메모리 예산 (None이면 무제한)
+            num_shards: 컬렉션별 인덱스 샤드 수
+        """
+        self.db_path = db_path
+        self.num_shards = num_shards
+        self.collections_path = os.path.join(db_path, "collections")
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024) if max_memory_mb else None
+        self._stores: "OrderedDict[str, VectorStore]" = OrderedDict()
+        # 축출됐지만 진행 중인 요청이 아직 참조하는 VectorStore (같은 경로에 두 번째 객체를 만들지 않도록 재사용)
+        self._evicted: "weakref.WeakValueDictionary[str, VectorStore]" = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        os.makedirs(self.collections_path, exist_ok=True)
+
+    def _collection_path(self, name: str) -> str:
+        """컬렉션의 저장 경로"""
+        if name == DEFAULT_COLLECTION:
+            return self.db_path
+        return os.path.join(self.collections_path, name)
+
+    def is_resident(self, name: Optional[str] = None) -> bool:
+        """컬렉션이 메모리에 로드되어 있는지 여부"""
+        name = validate_collection_name(name)
+        with self._lock:
+            store = self._stores.get(name)
+        return store is not None and store.is_loaded
+
+    def exists(self, name: Optional[str] = None) -> bool:
+        """컬렉션이 존재하는지 여부 (디스크나 메모리에 아무 것도 만들지 않음)"""
+        name = validate_collection_name(name)
+        if name == DEFAULT_COLLECTION:
+            return True
+        with self._lock:
+            if name in self._stores or name in self._evicted:
+                return True
+        return os.path.isdir(self._collection_path(name))
+
+    def get(self, name: Optional[str] = None, create: bool = True) -> VectorStore:
+        """
+        컬렉션의 VectorStore를 반환 (필요하면 디스크에서 로드하고 예산 초과분은 축출)
+
+        Args:
+            name: 컬렉션 이름 (None이면 default)
+            create: False이면 없는 컬렉션을 만들지 않고 CollectionNotFound 발생
+
+        Returns:
+            로드된 VectorStore 객체
+        """
+        name = validate_collection_name(name)
+        with self._lock:
+            store = self._stores.get(name)
+            if store is None:
+                store = self._evicted.pop(name, None)
+                if store is not None:
+                    logger.info(f"축출 후 사용 중인 컬렉션 재사용: {name}")
+                elif not create and name != DEFAULT_COLLECTION and not os.path.isdir(self._collection_path(name)):
+                    raise CollectionNotFound(name)
+                else:
+                    store = VectorStore(self._collection_path(name), lazy_load=True,
+                                        num_shards=self.num_shards)
+                self._stores[name] = store
+            self._stores.move_to_end(name)
+
+        if not store.is_loaded:
+            store.load()
+            logger.info(f"컬렉션 로드: {name}")
+        self.enforce_budget(keep=name)
+        return store
+
+    def enforce_budget(self, keep: Optional[str] = None):
+        """
+        상주 컬렉션의 메모리 합이 예산을 넘으면 가장 오래 사용되지 않은 컬렉션부터 축출
+
+        Args:
+            keep: 축출하지 않을 컬렉션 이름 (방금 사용한 컬렉션)
+        """
+        if self.max_memory_bytes is None:
+            return
+        keep = validate_collection_name(keep)
+        with self._lock:
+            usage = {name: store.memory_usage() for name, store in self._stores.items()}
+            total = sum(usage.values())
+            for name in list(self._stores.keys()):
+                if total <= self.max_memory_bytes:
+                    break
+                if name == keep or not self._stores[name].is_loaded:
+                    continue
+                # 진행 중인 요청이 참조하는 동안에는 다음 get()이 같은 객체를 재사용하고,
+                # 참조가 모두 사라지면 메모리에서 해제되어 다음 요청 때 디스크에서 다시 로드
+                self._evicted[name] = self._stores.pop(name)
+                total -= usage[name]
+                self.evictions += 1
+                logger.info(f"컬렉션 축출: {name} ({usage[name]} bytes)")
+
+    def list_collections(self) -> List[str]:
+        """디스크에 존재하거나 상주 중인 컬렉션 이름 목록"""
+        names = {DEFAULT_COLLECTION}
+        for entry in os.listdir(self.collections_path):
+            if os.path.isdir(os.path.join(self.collections_path, entry)) and _COLLECTION_NAME_RE.match(entry):
+                names.add(entry)
+        with self._lock:
+            names.update(self._stores.keys())
+        return sorted(names)
+
+    def clear(self, name: Optional[str] = None):
+        """
+        컬렉션 하나를 초기화 (다른 컬렉션에는 영향 없음)
+
+        Args:
+            name: 컬렉션 이름 (None이면 default)
+
+        Raises:
+            CollectionNotFound: 존재하지 않는 컬렉션
+        """
+        self.get(name, create=False).clear()
+
+    def _store_for_stats(self, name: str, resident: Dict[str, VectorStore]) -> VectorStore:
+        """통계용 VectorStore (상주하지 않는 컬렉션은 로드하지 않고 디스크 정보만 읽는 객체)"""
+        return resident.get(name) or VectorStore(self._collection_path(name), lazy_load=True,
+                                                 num_shards=self.num_shards)
+
+    def collection_stats(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """
+        컬렉션 하나의 통계 (상주하지 않는 컬렉션은 메모리에 로드하지 않고 디스크 기준으로 보고)
+
+        Args:
+            name: 컬렉션 이름 (None이면 default)
+
+        Raises:
+            CollectionNotFound: 존재하지 않는 컬렉션
+        """
+        name = validate_collection_name(name)
+        if not self.exists(name):
+            raise CollectionNotFound(name)
+        with self._lock:
+            store = self._stores.get(name) or self._evicted.get(name)
+        if store is not None and store.is_loaded:
+            return dict(store.get_stats(), resident=True)
+        store = self._store_for_stats(name, {})
+        return {
+            "total_documents": None,
+            "index_size": None,
+            "num_shards": self.num_shards,
+            "db_path": store.db_path,
+            "resident": False,
+            "disk_bytes": store.disk_usage()
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """컬렉션별 메모리/디스크 사용량과 상주 여부 반환"""
+        with self._lock:
+            resident = {name: store for name, store in self._stores.items() if store.is_loaded}
+
+        collections = {}
+        for name in self.list_collections():
+            store = self._store_for_stats(name, resident)
+            collections[name] = {
+                "resident": store.is_loaded,
+                "total_documents": len(store.documents) if store.is_loaded else None,
+                "memory_bytes": store.memory_usage(),
+                "disk_bytes": store.disk_usage()
+            }
+
+        return {
+            "collections": collections,
+            "resident_count": len(resident),
+            "memory_bytes": sum(c["memory_bytes"] for c in collections.values()),
+            "max_memory_bytes": self.max_memory_bytes,
+            "evictions": self.evictions
+        }
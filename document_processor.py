@@ -1,78 +1,180 @@
 import os
-import pdfplumber
-import tiktoken
-from typing import List, Dict, Any
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain.schema import Document
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+from extraction_cache import ExtractionCache
+from single_flight import SingleFlight
+from model_scheduler import ModelScheduler, INTERACTIVE
+from async_runner import run_sync, offload, offload_ingest, is_inline
 import logging
 
+# langchain, pdfplumber, tiktoken 등 무거운 모듈은 첫 사용 시점에 import 한다 (콜드 스타트 단축)
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def file_sha256(file_path: str) -> str:
+    """
+    파일 내용의 SHA-256 해시 계산 (청크 단위로 읽어 메모리 사용량 일정)
+    
+    Args:
+        file_path: 파일 경로
+        
+    Returns:
+        16진수 해시 문자열
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 class DocumentProcessor:
     """문서 처리, 청킹, 임베딩을 담당하는 클래스"""
     
-    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50):
+    # PDF 추출 로직이나 옵션이 바뀌면 버전을 올려 기존 추출 캐시를 무효화
+    PDF_EXTRACTOR_VERSION = 1
+    PDF_EXTRACT_OPTIONS = {
+        "layout": True,  # 레이아웃 정보 포함
+        "x_tolerance": 3,  # x축 허용 오차
+        "y_tolerance": 3   # y축 허용 오차
+    }
+    
+    # 임베딩 호출 1회에 보내는 최대 텍스트 수 (긴 인제스트 사이에 질의 임베딩이 끼어들 수 있도록 분할)
+    EMBEDDING_BATCH_SIZE = 64
+    
+    def __init__(self, chunk_size: int = 500, chunk_overlap: int = 50,
+                 extraction_cache_dir: Optional[str] = None,
+                 scheduler: Optional[ModelScheduler] = None):
         """
         DocumentProcessor 초기화
         
         Args:
             chunk_size: 청크 크기 (토큰 수)
             chunk_overlap: 청크 간 겹치는 토큰 수
+            extraction_cache_dir: PDF 추출 결과 캐시 경로 (None이면 캐시 사용 안 함)
+            scheduler: 임베딩 호출 스케줄러 (None이면 기본 설정으로 생성)
         """
+        self.scheduler = scheduler or ModelScheduler()
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        #self.embeddings = OpenAIEmbeddings()
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=self._count_tokens,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        self.extraction_cache = ExtractionCache(extraction_cache_dir) if extraction_cache_dir else None
+        # 같은 텍스트 목록에 대한 동시 임베딩 요청은 진행 중인 호출 하나를 공유
+        self.embedding_flight = SingleFlight("embedding")
+        # 임베딩 클라이언트, 텍스트 분할기, 토크나이저는 첫 사용 시 생성
+        self._embeddings = None
+        self._text_splitter = None
+        self._encoding = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def embeddings(self):
+        """임베딩 클라이언트 (첫 접근 시 생성)"""
+        if self._embeddings is None:
+            with self._client_lock:
+                if self._embeddings is None:
+                    #from langchain_openai import OpenAIEmbeddings
+                    #self._embeddings = OpenAIEmbeddings()
+                    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                    self._embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        return self._embeddings
+    
+    @embeddings.setter
+    def embeddings(self, value):
+        # 진행 중인 생성(워밍업 등)이 끝난 뒤에 교체해야 생성된 클라이언트가 덮어쓰지 않음
+        with self._client_lock:
+            self._embeddings = value
+    
+    @property
+    def text_splitter(self):
+        """텍스트 분할기 (첫 접근 시 생성)"""
+        if self._text_splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=self._count_tokens,
+                separators=["\n\n", "\n", " ", ""]
+            )
+        return self._text_splitter
     
     def _count_tokens(self, text: str) -> int:
         """텍스트의 토큰 수를 계산"""
-        encoding = tiktoken.get_encoding("cl100k_base")
-        return len(encoding.encode(text))
+        if self._encoding is None:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding("cl100k_base")
+        return len(self._encoding.encode(text))
     
-    def extract_text_from_pdf(self, file_path: str) -> str:
+    def _extract_pdf_pages(self, file_path: str):
+        """
+        PDF 파일에서 페이지별 텍스트 추출 (pdfplumber 사용)
+        
+        Args:
+            file_path: PDF 파일 경로
+            
+        Returns:
+            (페이지별 텍스트 리스트, 모든 페이지를 오류 없이 처리했는지 여부)
+        """
+        import pdfplumber
+        
+        pages = []
+        complete = True
+        with pdfplumber.open(file_path) as pdf:
+            logger.info(f"PDF 페이지 수: {len(pdf.pages)}")
+            
+            for i, page in enumerate(pdf.pages):
+                try:
+                    # 더 상세한 텍스트 추출 옵션
+                    page_text = page.extract_text(**self.PDF_EXTRACT_OPTIONS)
+                    
+                    if page_text:
+                        logger.info(f"Page {i+1} 텍스트 길이: {len(page_text)}")
+                    else:
+                        logger.warning(f"Page {i+1}에서 텍스트 추출 실패")
+                    pages.append(page_text or "")
+                        
+                except Exception as e:
+                    logger.error(f"Page {i+1} 처리 중 오류: {e}")
+                    pages.append("")
+                    complete = False
+        return pages, complete
+    
+    def extract_text_from_pdf(self, file_path: str, content_hash: Optional[str] = None) -> str:
         """
         PDF 파일에서 텍스트 추출 (pdfplumber 사용) - 개선된 버전
         
+        추출 캐시가 설정되어 있으면 파일 내용 해시와 추출 옵션이 같은 이전 결과를 재사용
+        
         Args:
             file_path: PDF 파일 경로
+            content_hash: 파일 내용의 SHA-256 해시 (None이면 캐시 사용 시 계산)
             
         Returns:
             추출된 텍스트
         """
         try:
-            text = ""
-            with pdfplumber.open(file_path) as pdf:
-                logger.info(f"PDF 페이지 수: {len(pdf.pages)}")
-                
-                for i, page in enumerate(pdf.pages):
-                    try:
-                        # 더 상세한 텍스트 추출 옵션
-                        page_text = page.extract_text(
-                            layout=True,  # 레이아웃 정보 포함
-                            x_tolerance=3,  # x축 허용 오차
-                            y_tolerance=3   # y축 허용 오차
-                        )
-                        
-                        if page_text:
-                            text += f"\n--- Page {i+1} ---\n{page_text}\n"
-                            logger.info(f"Page {i+1} 텍스트 길이: {len(page_text)}")
-                        else:
-                            logger.warning(f"Page {i+1}에서 텍스트 추출 실패")
-                            
-                    except Exception as e:
-                        logger.error(f"Page {i+1} 처리 중 오류: {e}")
-                        continue
+            pages = None
+            if self.extraction_cache is not None:
+                content_hash = content_hash or file_sha256(file_path)
+                pages = self.extraction_cache.get(content_hash, "pdfplumber",
+                                                  self.PDF_EXTRACTOR_VERSION, self.PDF_EXTRACT_OPTIONS)
+                if pages is not None:
+                    logger.info(f"PDF 추출 캐시 적중: {file_path} ({len(pages)}페이지)")
             
+            if pages is None:
+                pages, complete = self._extract_pdf_pages(file_path)
+                # 일부 페이지가 오류로 빠진 결과는 캐시하지 않음
+                if self.extraction_cache is not None and complete:
+                    self.extraction_cache.put(content_hash, "pdfplumber",
+                                              self.PDF_EXTRACTOR_VERSION, self.PDF_EXTRACT_OPTIONS, pages)
+            
+            text = "".join(f"\n--- Page {i+1} ---\n{page_text}\n"
+                           for i, page_text in enumerate(pages) if page_text)
             logger.info(f"PDF 텍스트 추출 완료: 총 {len(text)}자")
             return text
             
@@ -99,12 +201,13 @@ class DocumentProcessor:
             logger.error(f"TXT 텍스트 추출 실패: {e}")
             raise
     
-    def extract_text(self, file_path: str) -> str:
+    def extract_text(self, file_path: str, content_hash: Optional[str] = None) -> str:
         """
         파일 확장자에 따라 적절한 텍스트 추출 메서드 호출
         
         Args:
             file_path: 파일 경로
+            content_hash: 파일 내용의 SHA-256 해시 (PDF 추출 캐시 키로 사용)
             
         Returns:
             추출된 텍스트
@@ -112,7 +215,7 @@ class DocumentProcessor:
         file_extension = file_path.lower().split('.')[-1]
         
         if file_extension == 'pdf':
-            text = self.extract_text_from_pdf(file_path)
+            text = self.extract_text_from_pdf(file_path, content_hash)
             # 추출된 텍스트 앞부분 로그 출력
             logger.info(f"추출된 텍스트 앞 500자: {text[:500]}")
             return text
@@ -121,7 +224,7 @@ class DocumentProcessor:
         else:
             raise ValueError(f"지원하지 않는 파일 형식: {file_extension}")
     
-    def split_text(self, text: str, metadata: Dict[str, Any] = None) -> List[Document]:
+    def split_text(self, text: str, metadata: Dict[str, Any] = None) -> List['Document']:
         """
         텍스트를 청크로 분할
         
@@ -143,20 +246,52 @@ class DocumentProcessor:
             logger.error(f"텍스트 청킹 실패: {e}")
             raise
     
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+    async def aextract_text(self, file_path: str, content_hash: Optional[str] = None) -> str:
+        """extract_text()의 비동기 버전 (PDF 파싱은 CPU 작업이라 인제스트 스레드 풀에서 실행)"""
+        return await offload_ingest(self.extract_text, file_path, content_hash)
+    
+    async def asplit_text(self, text: str, metadata: Dict[str, Any] = None) -> List['Document']:
+        """split_text()의 비동기 버전 (토큰화는 CPU 작업이라 인제스트 스레드 풀에서 실행)"""
+        return await offload_ingest(self.split_text, text, metadata)
+    
+    async def _aembed(self, batch: List[str]) -> List[List[float]]:
+        """임베딩 클라이언트의 비동기 메서드 호출 (없거나 인라인 실행 중이면 동기 메서드 실행)"""
+        embeddings = self.embeddings
+        if hasattr(embeddings, "aembed_documents") and not is_inline():
+            return await embeddings.aembed_documents(batch)
+        return await offload(embeddings.embed_documents, batch)
+    
+    async def _aembed_batches(self, texts: List[str], priority: int) -> List[List[float]]:
+        """배치 단위로 나눠 스케줄러를 거쳐 임베딩"""
+        if self._embeddings is None:
+            # 첫 호출의 모듈 import와 클라이언트 생성이 이벤트 루프를 막지 않도록 스레드 풀에서 수행
+            await offload(getattr, self, "embeddings")
+        embeddings = []
+        for start in range(0, len(texts), self.EMBEDDING_BATCH_SIZE):
+            batch = texts[start:start + self.EMBEDDING_BATCH_SIZE]
+            embeddings.extend(await self.scheduler.arun("embedding", priority, self._aembed, batch))
+        return embeddings
+    
+    async def aget_embeddings(self, texts: List[str], priority: int = INTERACTIVE) -> List[List[float]]:
         """
-        텍스트 리스트를 임베딩 벡터로 변환
+        텍스트 리스트를 임베딩 벡터로 변환 (비동기)
         
         Args:
             texts: 임베딩할 텍스트 리스트
+            priority: 스케줄러 우선순위 (INTERACTIVE: 질의, BACKGROUND: 문서 인제스트)
             
         Returns:
-            임베딩 벡터 리스트
+            임베딩 벡터 리스트 (동시 요청과 공유될 수 있으므로 수정하지 말 것)
         """
         try:
-            embeddings = self.embeddings.embed_documents(texts)
+            key = hashlib.sha256("\x00".join(texts).encode('utf-8')).hexdigest()
+            embeddings = await self.embedding_flight.ado((priority, len(texts), key), self._aembed_batches, texts, priority)
             logger.info(f"임베딩 완료: {len(texts)}개 텍스트")
             return embeddings
         except Exception as e:
             logger.error(f"임베딩 실패: {e}")
-            raise 
\ No newline at end of file
+            raise
+    
+    def get_embeddings(self, texts: List[str], priority: int = INTERACTIVE) -> List[List[float]]:
+        """aget_embeddings()의 동기 버전 (공유 이벤트 루프에서 실행)"""
+        return run_sync(self.aget_embeddings(texts, priority))
@@ -0,0 +1,114 @@
+import os
+import gzip
+import json
+import uuid
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional
+import logging
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+class ExtractionCache:
+    """파일 내용 해시와 추출 설정을 키로 페이지별 추출 결과를 디스크에 캐시하는 클래스"""
+
+    def __init__(self, cache_dir: str = "./extraction_cache"):
+        """
+        ExtractionCache 초기화
+
+        Args:
+            cache_dir: 캐시 저장 경로
+        """
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, content_hash: str, extractor: str, version: int, options: Dict[str, Any]) -> str:
+        """캐시 항목 파일 경로 (해시, 추출기 이름/버전, 옵션을 모두 키에 포함)"""
+        key_source = json.dumps({
+            "content_hash": content_hash,
+            "extractor": extractor,
+            "version": version,
+            "options": options
+        }, sort_keys=True)
+        key = hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def get(self, content_hash: str, extractor: str, version: int,
+            options: Dict[str, Any]) -> Optional[List[str]]:
+        """
+        캐시된 페이지별 텍스트 조회
+
+        Args:
+            content_hash: 파일 내용의 SHA-256 해시
+            extractor: 추출기 이름 (예: "pdfplumber")
+            version: 추출기 버전 (추출 로직이 바뀌면 올려서 기존 캐시 무효화)
+            options: 추출 옵션
+
+        Returns:
+            페이지별 텍스트 리스트 또는 None (캐시 미스)
+        """
+        path = self._entry_path(content_hash, extractor, version, options)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                pages = json.load(f)["pages"]
+        except FileNotFoundError:
+            pages = None
+        except Exception as e:
+            logger.warning(f"추출 캐시 읽기 실패, 다시 추출합니다: {e}")
+            pages = None
+
+        with self._lock:
+            if pages is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return pages
+
+    def put(self, content_hash: str, extractor: str, version: int,
+            options: Dict[str, Any], pages: List[str]):
+        """
+        페이지별 텍스트를 캐시에 저장 (임시 파일에 쓴 뒤 교체하므로 동시 저장에도 안전)
+
+        Args:
+            content_hash: 파일 내용의 SHA-256 해시
+            extractor: 추출기 이름
+            version: 추출기 버전
+            options: 추출 옵션
+            pages: 페이지별 텍스트 리스트
+        """
+        path = self._entry_path(content_hash, extractor, version, options)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+                json.dump({"pages": pages}, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"추출 캐시 저장 실패: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """캐시 적중/미스 횟수와 디스크 사용량 반환"""
+        entries = 0
+        disk_bytes = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json.gz"):
+                    entries += 1
+                    disk_bytes += os.path.getsize(os.path.join(root, name))
+
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "entries": entries,
+            "disk_bytes": disk_bytes,
+            "cache_dir": self.cache_dir
+        }
@@ -0,0 +1,112 @@
+import time
+import asyncio
+import hashlib
+import random
+from typing import List
+import logging
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+class FakeEmbeddings:
+    """네트워크 없이 동작하는 결정적 임베딩 (같은 텍스트는 항상 같은 벡터)"""
+
+    def __init__(self, dimension: int = 768, latency: float = 0.0, per_text_latency: float = 0.0):
+        """
+        FakeEmbeddings 초기화
+
+        Args:
+            dimension: 임베딩 차원 (VectorStore와 같은 768)
+            latency: 호출당 인위적 지연 시간 (초)
+            per_text_latency: 텍스트당 추가 지연 시간 (초)
+        """
+        self.dimension = dimension
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+
+    def _embed(self, text: str) -> List[float]:
+        """텍스트 해시를 시드로 정규화된 벡터 생성"""
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'big')
+        rng = random.Random(seed)
+        vector = [rng.gauss(0.0, 1.0) for _ in range(self.dimension)]
+        norm = sum(v * v for v in vector) ** 0.5
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """텍스트 리스트 임베딩"""
+        time.sleep(self.latency + self.per_text_latency * len(texts))
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """질문 임베딩"""
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """텍스트 리스트 임베딩 (비동기, 지연 동안 이벤트 루프를 막지 않음)"""
+        await asyncio.sleep(self.latency + self.per_text_latency * len(texts))
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """질문 임베딩 (비동기)"""
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatResponse:
+    """LLM 응답 (langchain 메시지처럼 content 속성만 제공)"""
+
+    def __init__(self, content: str):
+        self.content = content
+
+
+class FakeChatModel:
+    """네트워크 없이 동작하는 결정적 LLM (프롬프트 해시로 답변 생성)"""
+
+    def __init__(self, latency: float = 0.0, per_char_latency: float = 0.0):
+        """
+        FakeChatModel 초기화
+
+        Args:
+            latency: 호출당 인위적 지연 시간 (초)
+            per_char_latency: 프롬프트 글자당 추가 지연 시간 (초, 긴 컨텍스트의 처리 시간 흉내)
+        """
+        self.latency = latency
+        self.per_char_latency = per_char_latency
+
+    def invoke(self, prompt: str) -> FakeChatResponse:
+        """프롬프트에 대한 답변 생성"""
+        time.sleep(self.latency + self.per_char_latency * len(prompt))
+        return self._answer(prompt)
+
+    async def ainvoke(self, prompt: str) -> FakeChatResponse:
+        """프롬프트에 대한 답변 생성 (비동기, 지연 동안 이벤트 루프를 막지 않음)"""
+        await asyncio.sleep(self.latency + self.per_char_latency * len(prompt))
+        return self._answer(prompt)
+
+    def _answer(self, prompt: str) -> FakeChatResponse:
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:16]
+        return FakeChatResponse(f"[fake answer {digest}] 프롬프트 길이 {len(prompt)}자")
+
+
+class WhitespaceEncoding:
+    """tiktoken 인코딩 파일을 받을 수 없는 오프라인 환경용 공백 기준 토크나이저"""
+
+    def encode(self, text: str) -> List[str]:
+        return text.split()
+
+
+def install_fake_providers(rag, embed_latency: float = 0.0, llm_latency: float = 0.0,
+                           offline_tokenizer: bool = False):
+    """
+    RAGSystem의 임베딩/LLM 클라이언트를 오프라인 대체 구현으로 교체
+
+    Args:
+        rag: RAGSystem 객체
+        embed_latency: 임베딩 호출당 지연 시간 (초)
+        llm_latency: LLM 호출당 지연 시간 (초)
+        offline_tokenizer: True이면 tiktoken 대신 공백 기준 토크나이저 사용
+    """
+    rag.document_processor.embeddings = FakeEmbeddings(latency=embed_latency)
+    rag.llm = FakeChatModel(latency=llm_latency)
+    if offline_tokenizer:
+        rag.document_processor._encoding = WhitespaceEncoding()
+    logger.info(f"가짜 모델 설치: 임베딩 지연 {embed_latency}s, LLM 지연 {llm_latency}s")
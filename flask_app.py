@@ -1,11 +1,18 @@
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import hmac
+import uuid
+import hashlib
+import functools
+import threading
+from flask import Flask, Request, request, jsonify, send_from_directory, make_response
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 from rag_system import RAGSystem
+from collection_manager import validate_collection_name, CollectionNotFound
+from profiling import profiled, find_profile, list_profiles, PROFILE_FORMATS
+from model_scheduler import ModelScheduler, INTERACTIVE, BACKGROUND
 import logging
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 # 환경변수 로드
 load_dotenv()
@@ -14,32 +21,189 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
-CORS(app)  # React 앱과의 통신을 위해 CORS 활성화
-
 # 업로드 폴더 설정
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'pdf', 'txt', 'hwp'}
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
-# RAG 시스템 초기화
+# 업로드 크기 제한 (파일별 크기는 multipart 파싱 중 검사하고, Content-Length가 있는 요청은
+# multipart 오버헤드를 감안한 여유를 두고 본문을 읽기 전에 거절)
+MAX_UPLOAD_MB = float(os.getenv('MAX_UPLOAD_MB', 50))
+MAX_UPLOAD_BYTES = int(MAX_UPLOAD_MB * 1024 * 1024)
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+class HashingUploadFile:
+    """multipart 파싱 중 업로드 파일을 업로드 폴더에 바로 쓰면서 SHA-256 해시와 크기를 계산하는 파일 객체"""
+    
+    def __init__(self, directory, max_bytes):
+        """
+        Args:
+            directory: 임시 파일을 만들 경로 (persist()로 같은 파일 시스템 안에서 이동)
+            max_bytes: 최대 허용 크기 (초과 시 파일을 지우고 413)
+        """
+        self.path = os.path.join(directory, f".upload-{uuid.uuid4().hex}.part")
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._file = open(self.path, 'w+b')
+    
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self.close()
+            raise RequestEntityTooLarge()
+        self._digest.update(data)
+        return self._file.write(data)
+    
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+    
+    @property
+    def sha256(self):
+        """지금까지 쓴 내용의 16진수 해시"""
+        return self._digest.hexdigest()
+    
+    def persist(self, dest_path):
+        """파일을 닫고 dest_path로 이동 (이후 close()에서 지우지 않음)"""
+        self._file.close()
+        os.replace(self.path, dest_path)
+    
+    def close(self):
+        """파일을 닫고, persist()로 옮기지 않은 임시 파일은 삭제 (요청 종료 시 호출됨)"""
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+class UploadRequest(Request):
+    """업로드 파일을 임시 파일에 한 번 쓴 뒤 다시 복사하지 않도록 파싱 단계에서 해시를 계산하는 요청 클래스"""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # 업로드 엔드포인트만 업로드 폴더에 쓰고, 다른 엔드포인트의 multipart 요청은 기본 임시 파일 사용
+        if self.endpoint != 'upload_document':
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return HashingUploadFile(UPLOAD_FOLDER, MAX_UPLOAD_BYTES)
+
+# 업로드 파일별 진행 중인 요청 수와 보존 여부 (인제스트에 실패한 파일은 다른 요청이 쓰지 않을 때만 삭제)
+_upload_files = {}
+_upload_files_lock = threading.Lock()
+
+def acquire_upload(upload, filepath):
+    """
+    임시 업로드 파일을 filepath로 옮기고 사용 중으로 표시
+    
+    이미 있던 파일은 다른 컬렉션이 참조할 수 있으므로 인제스트가 실패해도 지우지 않음
+    """
+    with _upload_files_lock:
+        entry = _upload_files.setdefault(filepath, {'refs': 0, 'keep': os.path.exists(filepath)})
+        entry['refs'] += 1
+        upload.persist(filepath)
+
+def release_upload(filepath, succeeded):
+    """업로드 파일 사용 종료 (마지막 요청이 끝났을 때 성공한 인제스트가 없으면 파일 삭제)"""
+    with _upload_files_lock:
+        entry = _upload_files[filepath]
+        entry['refs'] -= 1
+        entry['keep'] = entry['keep'] or succeeded
+        if entry['refs']:
+            return
+        del _upload_files[filepath]
+        if not entry['keep'] and os.path.exists(filepath):
+            os.remove(filepath)
+            logger.info(f"인제스트 실패로 업로드 파일 삭제: {filepath}")
+
+app = Flask(__name__)
+app.request_class = UploadRequest
+app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+CORS(app)  # React 앱과의 통신을 위해 CORS 활성화
+
+# 요청별 프로파일링 설정 (PROFILING_ENABLED=1 이고 PROFILING_TOKEN이 설정된 경우에만 X-Profile 헤더를 처리)
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', './profiles')
+if PROFILING_ENABLED and not PROFILING_TOKEN:
+    # 프로파일에는 코드 경로와 처리 시간이 담기므로 토큰 없이 누구나 받을 수 있게 열지 않음
+    logger.error("PROFILING_TOKEN이 설정되지 않아 요청별 프로파일링을 비활성화합니다.")
+    PROFILING_ENABLED = False
+
+# 외부 모델 호출 스케줄러 (공급자별 동시 호출 수, 우선순위별 대기열 크기와 대기 기한)
+scheduler = ModelScheduler(
+    concurrency={
+        'llm': int(os.getenv('LLM_CONCURRENCY', 4)),
+        'embedding': int(os.getenv('EMBEDDING_CONCURRENCY', 4))
+    },
+    max_queue=int(os.getenv('MODEL_QUEUE_SIZE', 64)),
+    deadlines={
+        INTERACTIVE: float(os.getenv('INTERACTIVE_DEADLINE_S', 10)),
+        BACKGROUND: float(os.getenv('BACKGROUND_DEADLINE_S', 300))
+    }
+)
+
+# RAG 시스템 초기화 (벡터 DB와 모델 클라이언트는 첫 사용 시 생성)
 rag = RAGSystem(
     chunk_size=int(os.getenv('CHUNK_SIZE', 1000)),
     chunk_overlap=int(os.getenv('CHUNK_OVERLAP', 50)),
-    db_path=os.getenv('VECTOR_DB_PATH', './vector_db')
+    db_path=os.getenv('VECTOR_DB_PATH', './vector_db'),
+    lazy_load=True,
+    max_memory_mb=float(os.getenv('COLLECTION_MEMORY_MB', 0)) or None,
+    num_shards=int(os.getenv('VECTOR_DB_SHARDS', 1)),
+    extraction_cache_dir=os.getenv('EXTRACTION_CACHE_DIR', './extraction_cache') or None,
+    scheduler=scheduler
 )
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-pro",
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+# 백그라운드에서 벡터 DB 로드 및 클라이언트 생성 (RAG_WARMUP=0 이면 첫 /api/ready 요청 시 시작)
+if os.getenv('RAG_WARMUP', '1') != '0':
+    rag.warm_up(background=True)
 
 def allowed_file(filename):
     """허용된 파일 확장자 확인"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def error_response(result):
+    """RAG 처리 실패 응답 (없는 컬렉션은 404, 스케줄러 거절은 Retry-After 헤더와 함께 503)"""
+    if result.get('not_found'):
+        return jsonify({'error': result['error']}), 404
+    if 'retry_after' in result:
+        response = jsonify({'error': result['error'], 'retry_after': result['retry_after']})
+        response.headers['Retry-After'] = str(result['retry_after'])
+        return response, 503
+    return jsonify({'error': result['error']}), 500
+
+def profiling_authorized():
+    """X-Profile-Token 헤더가 PROFILING_TOKEN과 일치하는지 확인"""
+    token = request.headers.get('X-Profile-Token', '')
+    return hmac.compare_digest(token.encode('utf-8'), PROFILING_TOKEN.encode('utf-8'))
+
+def profile_request(view):
+    """
+    X-Profile 헤더(pstats/speedscope, 1이면 pstats)가 있는 요청만 프로파일링하는 데코레이터
+    
+    저장된 프로파일 id는 X-Profile-Id 응답 헤더로 반환되고 /api/profiles/<id> 에서 받을 수 있음
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        fmt = request.headers.get('X-Profile') if PROFILING_ENABLED else None
+        if not fmt:
+            return view(*args, **kwargs)
+        
+        if not profiling_authorized():
+            return jsonify({'error': '프로파일링 권한이 없습니다.'}), 403
+        fmt = 'pstats' if fmt in ('1', 'true') else fmt
+        if fmt not in PROFILE_FORMATS:
+            return jsonify({'error': f"지원하지 않는 프로파일 형식: {fmt} (가능: {', '.join(PROFILE_FORMATS)})"}), 400
+        
+        try:
+            with profiled(request.endpoint, fmt, PROFILE_DIR) as info:
+                response = make_response(view(*args, **kwargs))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if info['profile_id']:
+            response.headers['X-Profile-Id'] = info['profile_id']
+        return response
+    return wrapper
+
 @app.route('/api/upload', methods=['POST'])
+@profile_request
 def upload_document():
     """문서 업로드 및 벡터 DB에 추가"""
     try:
@@ -50,31 +214,61 @@ def upload_document():
         if file.filename == '':
             return jsonify({'error': '선택된 파일이 없습니다.'}), 400
         
+        try:
+            collection = validate_collection_name(request.form.get('collection'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         if file and allowed_file(file.filename):
-            # 파일 저장
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
+            # 파일은 요청 파싱 중 이미 업로드 폴더의 임시 파일에 저장되었고 내용 해시도 계산됨
+            # (persist()하지 않은 임시 파일은 요청 종료 시 삭제)
+            extension = file.filename.rsplit('.', 1)[1].lower()
+            upload = file.stream
+            content_hash, size = upload.sha256, upload.size
+            
+            # 이미 추가된 문서면 추출/청킹/임베딩 없이 기존 통계 반환
+            existing = rag.collections.get(collection).find_document(content_hash)
+            if existing:
+                return jsonify({
+                    'message': '이미 추가된 문서입니다.',
+                    'duplicate': True,
+                    'chunks_created': existing['chunks'],
+                    'total_tokens': existing['total_tokens']
+                })
+            
+            # 내용 해시 기반 파일 이름으로 저장 (같은 이름의 다른 파일이 서로 덮어쓰지 않음)
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{content_hash}.{extension}")
+            acquire_upload(upload, filepath)
+            logger.info(f"업로드 저장 완료: {file.filename} -> {filepath} ({size} bytes)")
             
             # RAG 시스템에 문서 추가
-            result = rag.add_document(filepath)
+            result = None
+            try:
+                result = rag.add_document(filepath, collection=collection,
+                                          content_hash=content_hash, filename=file.filename)
+            finally:
+                release_upload(filepath, result is not None and result['status'] == 'success')
             
             if result['status'] == 'success':
                 return jsonify({
-                    'message': '문서가 성공적으로 추가되었습니다.',
+                    'message': '이미 추가된 문서입니다.' if result['duplicate'] else '문서가 성공적으로 추가되었습니다.',
+                    'duplicate': result['duplicate'],
                     'chunks_created': result['chunks_created'],
                     'total_tokens': result['total_tokens']
                 })
             else:
-                return jsonify({'error': result['error']}), 500
+                return error_response(result)
         
         return jsonify({'error': '지원하지 않는 파일 형식입니다.'}), 400
         
+    except RequestEntityTooLarge:
+        return jsonify({'error': f'파일 크기가 제한({MAX_UPLOAD_MB:g}MB)을 초과했습니다.'}), 413
     except Exception as e:
         logger.error(f"문서 업로드 오류: {e}")
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/query', methods=['POST'])
+@profile_request
 def query():
     """질문에 대한 답변 생성"""
     try:
@@ -84,8 +278,13 @@ def query():
         if not question:
             return jsonify({'error': '질문을 입력해주세요.'}), 400
         
+        try:
+            collection = validate_collection_name(data.get('collection'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # RAG 시스템으로 질문 처리
-        result = rag.query(question)
+        result = rag.query(question, collection=collection)
         
         if result['status'] == 'success':
             logger.debug(result['answer'])
@@ -96,7 +295,7 @@ def query():
                 'context_length': result['context_length']
             })
         else:
-            return jsonify({'error': result['error']}), 500
+            return error_response(result)
             
     except Exception as e:
         logger.error(f"질문 처리 오류: {e}")
@@ -106,27 +305,82 @@ def query():
 def get_stats():
     """시스템 통계 정보 반환"""
     try:
-        stats = rag.get_stats()
+        collection = validate_collection_name(request.args.get('collection'))
+        stats = rag.get_stats(collection)
         return jsonify(stats)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except CollectionNotFound as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         logger.error(f"통계 조회 오류: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/collections', methods=['GET'])
+def list_collections():
+    """컬렉션 목록과 컬렉션별 메모리/디스크 사용량 반환"""
+    try:
+        return jsonify(rag.collections.get_stats())
+    except Exception as e:
+        logger.error(f"컬렉션 조회 오류: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/clear', methods=['POST'])
 def clear_database():
-    """벡터 DB 초기화"""
+    """벡터 DB 초기화 (지정한 컬렉션만)"""
     try:
-        rag.clear_database()
-        return jsonify({'message': '벡터 DB가 초기화되었습니다.'})
+        data = request.get_json(silent=True) or {}
+        collection = validate_collection_name(data.get('collection'))
+        rag.clear_database(collection)
+        return jsonify({'message': f'벡터 DB가 초기화되었습니다. (컬렉션: {collection})'})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except CollectionNotFound as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         logger.error(f"DB 초기화 오류: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """저장된 요청 프로파일 목록"""
+    if not PROFILING_ENABLED:
+        return jsonify({'error': '프로파일링이 비활성화되어 있습니다.'}), 404
+    if not profiling_authorized():
+        return jsonify({'error': '프로파일링 권한이 없습니다.'}), 403
+    return jsonify({'profiles': list_profiles(PROFILE_DIR)})
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def download_profile(profile_id):
+    """요청 프로파일 파일 다운로드"""
+    if not PROFILING_ENABLED:
+        return jsonify({'error': '프로파일링이 비활성화되어 있습니다.'}), 404
+    if not profiling_authorized():
+        return jsonify({'error': '프로파일링 권한이 없습니다.'}), 403
+    filename = find_profile(profile_id, PROFILE_DIR)
+    if filename is None:
+        return jsonify({'error': '프로파일을 찾을 수 없습니다.'}), 404
+    return send_from_directory(os.path.abspath(PROFILE_DIR), filename, as_attachment=True)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """모델 호출 대기열 지표 (Prometheus 텍스트 형식)"""
+    return app.response_class(scheduler.prometheus_metrics(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """헬스 체크"""
     return jsonify({'status': 'healthy', 'message': 'RAG 시스템이 정상 작동 중입니다.'})
 
+@app.route('/api/ready', methods=['GET'])
+def readiness_check():
+    """레디니스 체크 (워밍업 완료 여부, 워밍업 전이면 백그라운드 워밍업 시작)"""
+    if rag.is_ready():
+        return jsonify({'status': 'ready', 'message': '벡터 DB 로드가 완료되었습니다.'})
+    # RAG_WARMUP=0 이어도 레디니스를 기다리는 트래픽이 들어오지 않으므로 여기서 워밍업을 시작
+    rag.warm_up(background=True)
+    return jsonify({'status': 'loading', 'message': '벡터 DB를 로드하는 중입니다.'}), 503
+
 if __name__ == '__main__':
     # OpenAI API 키 확인
     if not os.getenv('GOOGLE_API_KEY'):
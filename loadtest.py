@@ -0,0 +1,316 @@
+import os
+import io
+import math
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+QUESTIONS = [
+    "이 문서의 핵심 내용은 무엇인가요?",
+    "계약 기간은 어떻게 되나요?",
+    "주요 위험 요소를 요약해주세요.",
+    "비용 관련 조항을 알려주세요.",
+    "담당 부서는 어디인가요?",
+]
+
+WORDS = ["계약", "기간", "비용", "위험", "부서", "보고서", "일정", "품질", "검토", "승인",
+         "data", "system", "report", "budget", "schedule", "review", "risk", "policy"]
+
+
+def serve(args):
+    """
+    가짜 모델을 설치한 flask_app을 스레드 서버로 실행 (--serve 모드, 부하 발생기와 다른 프로세스)
+
+    서버 기본 URL을 표준 출력 첫 줄에 쓰고 종료될 때까지 요청을 처리
+    """
+    work_dir = tempfile.mkdtemp(prefix="rag-loadtest-")
+    os.environ.setdefault('VECTOR_DB_PATH', os.path.join(work_dir, 'vector_db'))
+    os.environ.setdefault('EXTRACTION_CACHE_DIR', os.path.join(work_dir, 'extraction_cache'))
+    os.environ['RAG_WARMUP'] = '0'
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(work_dir)  # uploads/ 폴더도 임시 경로에 생성
+
+    import logging
+    import flask_app
+    from fake_providers import install_fake_providers
+    from werkzeug.serving import make_server
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    install_fake_providers(flask_app.rag, embed_latency=args.embed_latency,
+                           llm_latency=args.llm_latency, offline_tokenizer=not args.tiktoken)
+
+    server = make_server('127.0.0.1', args.port, flask_app.app, threaded=True)
+    print(f"http://127.0.0.1:{server.server_port}", flush=True)
+    server.serve_forever()
+
+
+def start_local_server(args) -> Tuple[str, subprocess.Popen]:
+    """
+    가짜 모델 서버를 자식 프로세스로 시작 (부하 발생기와 GIL을 나눠 쓰지 않도록)
+
+    Returns:
+        (서버 기본 URL, 서버 프로세스)
+    """
+    command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(args.port),
+               '--embed-latency', str(args.embed_latency), '--llm-latency', str(args.llm_latency)]
+    if args.tiktoken:
+        command.append('--tiktoken')
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    base_url = process.stdout.readline().strip()
+    if not base_url:
+        process.kill()
+        raise RuntimeError(f"부하 테스트 서버 시작 실패 (종료 코드 {process.wait()})")
+    return base_url, process
+
+
+def make_document(rng: random.Random, num_words: int) -> bytes:
+    """업로드할 무작위 텍스트 문서 생성 (매번 내용이 달라 중복 제거에 걸리지 않음)"""
+    words = [rng.choice(WORDS) for _ in range(num_words)]
+    return (f"문서 {uuid.uuid4().hex}\n" + " ".join(words)).encode('utf-8')
+
+
+def post_json(url: str, payload: Dict[str, Any], timeout: float) -> int:
+    """JSON POST 요청을 보내고 상태 코드 반환"""
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+def post_file(url: str, filename: str, content: bytes, fields: Dict[str, str], timeout: float) -> int:
+    """multipart/form-data 파일 업로드 요청을 보내고 상태 코드 반환"""
+    boundary = uuid.uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields.items():
+        body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n{value}\r\n".encode('utf-8'))
+    body.write(f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+               f"Content-Type: text/plain\r\n\r\n".encode('utf-8'))
+    body.write(content)
+    body.write(f"\r\n--{boundary}--\r\n".encode('utf-8'))
+    request = urllib.request.Request(url, data=body.getvalue(),
+                                     headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+class LoadTester:
+    """질의/업로드 혼합 부하를 발생시키고 요청별 지연 시간을 기록하는 클래스"""
+
+    def __init__(self, base_url: str, args):
+        self.base_url = base_url
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.rng_lock = threading.Lock()
+        self.records: List[Dict[str, Any]] = []
+        self.records_lock = threading.Lock()
+        self.uploads_in_flight = 0
+        self.seed_errors: List[str] = []
+
+    def _choose(self):
+        """다음 요청 종류와 내용 선택"""
+        with self.rng_lock:
+            if self.rng.random() < self.args.upload_ratio:
+                return "upload", make_document(self.rng, self.args.doc_words)
+            return "query", self.rng.choice(QUESTIONS)
+
+    def _request(self, kind: str, payload, scheduled: Optional[float] = None):
+        """
+        요청 1건 실행 및 기록
+
+        Args:
+            kind: "query" 또는 "upload"
+            payload: 질문 문자열 또는 문서 바이트
+            scheduled: 목표 RPS 모드에서 요청이 시작됐어야 할 시각 (지연 시간에 대기열 시간 포함)
+        """
+        overlapped = self.uploads_in_flight > 0
+        if kind == "upload":
+            with self.records_lock:
+                self.uploads_in_flight += 1
+        start = time.perf_counter()
+        status, error = 0, None
+        try:
+            if kind == "query":
+                status = post_json(f"{self.base_url}/api/query",
+                                   {'question': payload, 'collection': self.args.collection},
+                                   self.args.timeout)
+            else:
+                status = post_file(f"{self.base_url}/api/upload", f"{uuid.uuid4().hex}.txt", payload,
+                                   {'collection': self.args.collection}, self.args.timeout)
+        except urllib.error.HTTPError as e:
+            status, error = e.code, str(e)
+        except Exception as e:
+            error = str(e)
+        end = time.perf_counter()
+        if kind == "upload":
+            with self.records_lock:
+                self.uploads_in_flight -= 1
+
+        with self.records_lock:
+            self.records.append({
+                "kind": kind,
+                "latency": end - (scheduled if scheduled is not None else start),
+                "ok": error is None and 200 <= status < 300,
+                "status": status,
+                "error": error,
+                "overlapped_upload": overlapped
+            })
+
+    def seed(self):
+        """측정 전에 문서를 미리 업로드 (실패는 기록만 하고 측정은 계속)"""
+        for _ in range(self.args.seed_docs):
+            with self.rng_lock:
+                document = make_document(self.rng, self.args.doc_words)
+            try:
+                post_file(f"{self.base_url}/api/upload", f"seed-{uuid.uuid4().hex}.txt", document,
+                          {'collection': self.args.collection}, self.args.timeout)
+            except Exception as e:
+                self.seed_errors.append(str(e))
+
+    def run_closed_loop(self):
+        """고정 동시성 모드: 각 워커가 응답을 받으면 바로 다음 요청을 보냄"""
+        deadline = time.perf_counter() + self.args.duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                self._request(*self._choose())
+
+        threads = [threading.Thread(target=worker) for _ in range(self.args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def run_open_loop(self):
+        """목표 RPS 모드: 응답과 무관하게 일정 간격으로 요청을 시작"""
+        interval = 1.0 / self.args.rps
+        total = int(self.args.duration * self.args.rps)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.max_workers) as executor:
+            for i in range(total):
+                scheduled = start + i * interval
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                kind, payload = self._choose()
+                executor.submit(self._request, kind, payload, scheduled)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """정렬된 값의 p 백분위수 (최근접 순위)"""
+    if not values:
+        return float('nan')
+    index = max(1, math.ceil(p / 100 * len(values))) - 1
+    return values[index]
+
+
+def summarize(records: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """요청 종류별 처리량, 지연 시간 백분위수, 오류율 집계"""
+    groups = defaultdict(list)
+    for record in records:
+        groups[record["kind"]].append(record)
+        if record["kind"] == "query":
+            groups["query (업로드와 겹침)" if record["overlapped_upload"] else "query (단독)"].append(record)
+
+    summary = {}
+    for name, items in sorted(groups.items()):
+        latencies = sorted(r["latency"] * 1000 for r in items if r["ok"])
+        errors = [r for r in items if not r["ok"]]
+        status_codes = defaultdict(int)
+        for r in items:
+            status_codes[str(r["status"])] += 1
+        summary[name] = {
+            "count": len(items),
+            "throughput_rps": len(items) / elapsed if elapsed else 0.0,
+            "error_rate": len(errors) / len(items) if items else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "max_ms": latencies[-1] if latencies else float('nan'),
+            "status_codes": dict(status_codes)
+        }
+    return summary
+
+
+def print_report(summary: Dict[str, Any], elapsed: float, args, seed_errors: List[str]):
+    """지연 시간 보고서 출력"""
+    mode = f"목표 {args.rps} RPS" if args.rps else f"동시성 {args.concurrency}"
+    print(f"=== 부하 테스트 결과 ({mode}, {elapsed:.1f}초, 업로드 비율 {args.upload_ratio:.0%}) ===")
+    if seed_errors:
+        print(f"경고: 사전 업로드 {len(seed_errors)}/{args.seed_docs}건 실패 (첫 오류: {seed_errors[0]})")
+    print(f"{'요청':<22}{'건수':>7}{'RPS':>9}{'오류율':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, s in summary.items():
+        print(f"{name:<22}{s['count']:>7}{s['throughput_rps']:>9.1f}{s['error_rate']:>9.1%}"
+              f"{s['p50_ms']:>8.1f}ms{s['p95_ms']:>8.1f}ms{s['p99_ms']:>8.1f}ms{s['max_ms']:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask API 부하 테스트 (오프라인 가짜 임베딩/LLM 사용)")
+    parser.add_argument('--url', help="이미 실행 중인 서버 URL (지정하지 않으면 가짜 모델로 내부 서버 시작)")
+    parser.add_argument('--port', type=int, default=0, help="내부 서버 포트 (0이면 임의 포트)")
+    parser.add_argument('--duration', type=float, default=10.0, help="측정 시간 (초)")
+    parser.add_argument('--concurrency', type=int, default=8, help="고정 동시성 모드의 동시 요청 수")
+    parser.add_argument('--rps', type=float, default=0.0, help="목표 RPS (지정하면 고정 동시성 대신 개방형 부하)")
+    parser.add_argument('--max-workers', type=int, default=64, help="목표 RPS 모드의 최대 동시 요청 수")
+    parser.add_argument('--upload-ratio', type=float, default=0.1, help="전체 요청 중 업로드 비율")
+    parser.add_argument('--seed-docs', type=int, default=20, help="측정 전 미리 업로드할 문서 수")
+    parser.add_argument('--doc-words', type=int, default=2000, help="업로드 문서당 단어 수")
+    parser.add_argument('--collection', default="loadtest", help="사용할 컬렉션 이름")
+    parser.add_argument('--embed-latency', type=float, default=0.05, help="가짜 임베딩 호출 지연 (초)")
+    parser.add_argument('--llm-latency', type=float, default=0.5, help="가짜 LLM 호출 지연 (초)")
+    parser.add_argument('--tiktoken', action='store_true',
+                        help="내부 서버에서 공백 기준 토크나이저 대신 tiktoken 사용 (인코딩 파일을 받을 수 있는 환경)")
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--timeout', type=float, default=60.0, help="요청 타임아웃 (초)")
+    parser.add_argument('--seed', type=int, default=0, help="난수 시드")
+    parser.add_argument('--json', help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+    if args.serve:
+        serve(args)
+        return
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip('/')
+    else:
+        base_url, server = start_local_server(args)
+    try:
+        tester = LoadTester(base_url, args)
+        tester.seed()
+
+        start = time.perf_counter()
+        if args.rps:
+            tester.run_open_loop()
+        else:
+            tester.run_closed_loop()
+        elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(tester.records, elapsed)
+    print_report(summary, elapsed, args, tester.seed_errors)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"config": vars(args), "elapsed": elapsed, "summary": summary,
+                       "seed_errors": tester.seed_errors}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
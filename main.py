@@ -2,6 +2,7 @@ import os
 import sys
 from dotenv import load_dotenv
 from rag_system import RAGSystem
+from profiling import profiled
 import logging
 
 # 환경변수 로드
@@ -14,6 +15,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def run_profiled(name, func, *args):
+    """RAG_PROFILE(pstats/speedscope)이 설정되어 있으면 호출을 프로파일링하고 저장 경로 출력"""
+    fmt = os.getenv('RAG_PROFILE', '')
+    if not fmt:
+        return func(*args)
+    with profiled(name, fmt, os.getenv('PROFILE_DIR', './profiles')) as info:
+        result = func(*args)
+    print(f"🔬 프로파일 저장: {info['path']}")
+    return result
+
 def main():
     """RAG 시스템 메인 실행 함수"""
     
@@ -27,7 +38,9 @@ def main():
     rag = RAGSystem(
         chunk_size=int(os.getenv('CHUNK_SIZE', 500)),
         chunk_overlap=int(os.getenv('CHUNK_OVERLAP', 50)),
-        db_path=os.getenv('VECTOR_DB_PATH', './vector_db')
+        db_path=os.getenv('VECTOR_DB_PATH', './vector_db'),
+        num_shards=int(os.getenv('VECTOR_DB_SHARDS', 1)),
+        extraction_cache_dir=os.getenv('EXTRACTION_CACHE_DIR', './extraction_cache') or None
     )
     
     print("=== RAG 시스템 시작 ===")
@@ -45,8 +58,10 @@ def main():
                 # 문서 추가
                 file_path = input("문서 파일 경로를 입력하세요: ").strip()
                 if os.path.exists(file_path):
-                    result = rag.add_document(file_path)
-                    if result['status'] == 'success':
+                    result = run_profiled("add_document", rag.add_document, file_path)
+                    if result['status'] == 'success' and result.get('duplicate'):
+                        print(f"ℹ️ 이미 추가된 문서입니다. (청크 {result['chunks_created']}개)")
+                    elif result['status'] == 'success':
                         print(f"✅ 문서 추가 성공!")
                         print(f"   - 생성된 청크: {result['chunks_created']}개")
                         print(f"   - 총 토큰 수: {result['total_tokens']}")
@@ -60,7 +75,7 @@ def main():
                 question = input("질문을 입력하세요: ").strip()
                 if question:
                     print("🤔 답변을 생성 중입니다...")
-                    result = rag.query(question)
+                    result = run_profiled("query", rag.query, question)
                     if result['status'] == 'success':
                         print(f"\n💡 답변:")
                         print(result['answer'])
@@ -80,6 +95,10 @@ def main():
                 print(f"   - 청크 크기: {stats['chunk_size']}")
                 print(f"   - 청크 겹침: {stats['chunk_overlap']}")
                 print(f"   - DB 경로: {stats['vector_store']['db_path']}")
+                if stats['extraction_cache']:
+                    cache_stats = stats['extraction_cache']
+                    print(f"   - 추출 캐시: 적중 {cache_stats['hits']}회 / 미스 {cache_stats['misses']}회, "
+                          f"{cache_stats['entries']}개 항목, {cache_stats['disk_bytes'] / 1024:.1f}KB")
             
             elif choice == '4':
                 # DB 초기화
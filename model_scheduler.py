@@ -0,0 +1,248 @@
+import math
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# 우선순위 클래스 (값이 작을수록 먼저 처리)
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+class SchedulerRejected(Exception):
+    """대기열 포화 또는 대기 기한 초과로 모델 호출이 거절됨"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    """대기열에 들어간 호출 1건"""
+
+    __slots__ = ("priority", "seq", "enqueued", "cancelled", "waker")
+
+    def __init__(self, priority: int, seq: int, waker: Callable[[], Any]):
+        self.priority = priority
+        self.seq = seq
+        self.enqueued = time.perf_counter()
+        self.cancelled = False
+        self.waker = waker  # 대기 중인 코루틴을 깨우는 콜백 (어느 스레드에서 호출해도 됨)
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _ProviderQueue:
+    """공급자(LLM, 임베딩 등) 하나의 동시 실행 제한과 우선순위 대기열"""
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.heap = []
+        self.waiting = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.lock = threading.Lock()
+        self.admitted = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.rejected = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.timed_out = {INTERACTIVE: 0, BACKGROUND: 0}
+        self.wait_times = {INTERACTIVE: deque(maxlen=1000), BACKGROUND: deque(maxlen=1000)}
+        self.wait_total = {INTERACTIVE: 0.0, BACKGROUND: 0.0}
+        self.service_times = deque(maxlen=100)
+
+    def _head(self) -> Optional[_Ticket]:
+        """취소되지 않은 가장 높은 우선순위의 대기 호출"""
+        while self.heap and self.heap[0].cancelled:
+            heapq.heappop(self.heap)
+        return self.heap[0] if self.heap else None
+
+    def retry_after(self) -> int:
+        """대기열이 빠지기까지 걸릴 예상 시간 (초, 최소 1)"""
+        service = sum(self.service_times) / len(self.service_times) if self.service_times else 1.0
+        queued = sum(self.waiting.values())
+        return max(1, math.ceil(service * (queued + 1) / self.max_concurrency))
+
+
+class ModelScheduler:
+    """외부 모델 호출의 공급자별 동시 실행 수, 우선순위, 대기 기한, 부하 차단을 관리하는 클래스"""
+
+    def __init__(self,
+                 concurrency: Optional[Dict[str, int]] = None,
+                 max_queue: int = 64,
+                 deadlines: Optional[Dict[int, float]] = None):
+        """
+        ModelScheduler 초기화
+
+        Args:
+            concurrency: 공급자별 최대 동시 호출 수 (기본값: llm 4, embedding 4)
+            max_queue: 우선순위 클래스별 최대 대기 호출 수 (초과 시 즉시 거절)
+            deadlines: 우선순위 클래스별 최대 대기 시간 (초, 기본값: interactive 10, background 300)
+        """
+        concurrency = concurrency or {"llm": 4, "embedding": 4}
+        self.max_queue = max_queue
+        self.deadlines = {INTERACTIVE: 10.0, BACKGROUND: 300.0, **(deadlines or {})}
+        self._providers = {name: _ProviderQueue(name, limit) for name, limit in concurrency.items()}
+        self._seq = itertools.count()
+
+    async def arun(self, provider: str, priority: int, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        실행 슬롯을 얻은 뒤 func 실행 (슬롯을 기다리는 동안 이벤트 루프를 막지 않음)
+
+        Args:
+            provider: 공급자 이름 ("llm", "embedding")
+            priority: INTERACTIVE 또는 BACKGROUND
+            func: 코루틴 함수
+
+        Returns:
+            func의 반환값
+
+        Raises:
+            SchedulerRejected: 대기열이 가득 찼거나 대기 기한을 넘긴 경우
+        """
+        queue = self._providers[provider]
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        with queue.lock:
+            ticket, deadline = self._enqueue(queue, priority, lambda: loop.call_soon_threadsafe(wakeup.set))
+
+        try:
+            while True:
+                with queue.lock:
+                    if self._try_admit(queue, ticket):
+                        break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        raise self._timed_out(queue, priority)
+                    wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with queue.lock:
+                self._abandon(queue, ticket)
+            raise
+
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            self._release(queue, start)
+
+    def _enqueue(self, queue: _ProviderQueue, priority: int, waker: Callable[[], Any]):
+        """대기열에 호출 등록 (queue.lock 보유 상태에서 호출, 포화 시 거절)"""
+        if queue.waiting[priority] >= self.max_queue:
+            queue.rejected[priority] += 1
+            retry_after = queue.retry_after()
+            logger.warning(f"{queue.name} 대기열 포화로 {PRIORITY_NAMES[priority]} 호출 거절 (재시도 {retry_after}초 후)")
+            raise SchedulerRejected(f"{queue.name} 호출 대기열이 가득 찼습니다.", retry_after)
+
+        ticket = _Ticket(priority, next(self._seq), waker)
+        heapq.heappush(queue.heap, ticket)
+        queue.waiting[priority] += 1
+        return ticket, ticket.enqueued + self.deadlines[priority]
+
+    def _try_admit(self, queue: _ProviderQueue, ticket: _Ticket) -> bool:
+        """슬롯이 비어 있고 ticket이 맨 앞이면 실행 허가 (queue.lock 보유 상태에서 호출)"""
+        if not (queue.in_flight < queue.max_concurrency and queue._head() is ticket):
+            return False
+        heapq.heappop(queue.heap)
+        queue.waiting[ticket.priority] -= 1
+        queue.in_flight += 1
+        queue.admitted[ticket.priority] += 1
+        waited = time.perf_counter() - ticket.enqueued
+        queue.wait_times[ticket.priority].append(waited)
+        queue.wait_total[ticket.priority] += waited
+        # 다음 대기자도 남은 슬롯이 있으면 바로 진행할 수 있도록 깨움
+        self._notify(queue)
+        return True
+
+    def _timed_out(self, queue: _ProviderQueue, priority: int) -> SchedulerRejected:
+        """대기 기한 초과 기록 후 던질 예외 반환"""
+        queue.timed_out[priority] += 1
+        logger.warning(f"{queue.name} {PRIORITY_NAMES[priority]} 호출 대기 기한 초과 ({self.deadlines[priority]}초)")
+        return SchedulerRejected(f"{queue.name} 호출 대기 시간이 초과되었습니다.", queue.retry_after())
+
+    def _abandon(self, queue: _ProviderQueue, ticket: _Ticket):
+        """허가받지 못한 채 대기를 그만둔 호출 제거 (queue.lock 보유 상태에서 호출)"""
+        ticket.cancelled = True
+        queue.waiting[ticket.priority] -= 1
+        self._notify(queue)
+
+    def _release(self, queue: _ProviderQueue, start: float):
+        """실행이 끝난 호출의 슬롯 반환"""
+        with queue.lock:
+            queue.in_flight -= 1
+            queue.service_times.append(time.perf_counter() - start)
+            self._notify(queue)
+
+    def _notify(self, queue: _ProviderQueue):
+        """상태 변화를 대기열 맨 앞의 호출에게 알림 (다음으로 허가받을 수 있는 호출만 깨움)"""
+        head = queue._head()
+        if head is not None:
+            head.waker()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """공급자/우선순위별 대기열 깊이, 대기 시간, 거절/기한 초과 수 반환"""
+        stats = {}
+        for name, queue in self._providers.items():
+            with queue.lock:
+                classes = {}
+                for priority, label in PRIORITY_NAMES.items():
+                    waits = sorted(queue.wait_times[priority])
+                    classes[label] = {
+                        "queue_depth": queue.waiting[priority],
+                        "admitted": queue.admitted[priority],
+                        "rejected": queue.rejected[priority],
+                        "timed_out": queue.timed_out[priority],
+                        "wait_avg_ms": sum(waits) / len(waits) * 1000 if waits else 0.0,
+                        "wait_p95_ms": waits[max(0, math.ceil(0.95 * len(waits)) - 1)] * 1000 if waits else 0.0,
+                        "wait_max_ms": waits[-1] * 1000 if waits else 0.0
+                    }
+                stats[name] = {
+                    "max_concurrency": queue.max_concurrency,
+                    "in_flight": queue.in_flight,
+                    "priorities": classes
+                }
+        return stats
+
+    def prometheus_metrics(self) -> str:
+        """Prometheus 텍스트 형식 지표 (지표마다 HELP, TYPE, 샘플을 한 묶음으로 출력)"""
+        queue_depth, in_flight, calls, wait = [], [], [], []
+        for provider, queue in self._providers.items():
+            with queue.lock:
+                in_flight.append(f'rag_model_in_flight{{provider="{provider}"}} {queue.in_flight}')
+                for priority, label in PRIORITY_NAMES.items():
+                    labels = f'provider="{provider}",priority="{label}"'
+                    queue_depth.append(f'rag_model_queue_depth{{{labels}}} {queue.waiting[priority]}')
+                    for outcome, counts in (("admitted", queue.admitted), ("rejected", queue.rejected),
+                                            ("timed_out", queue.timed_out)):
+                        calls.append(f'rag_model_calls_total{{{labels},outcome="{outcome}"}} {counts[priority]}')
+                    # 분위수는 최근 대기 시간 기준, 합계와 건수는 시작 이후 누적
+                    waits = sorted(queue.wait_times[priority])
+                    for quantile in ("0.5", "0.95", "0.99"):
+                        value = waits[max(0, math.ceil(float(quantile) * len(waits)) - 1)] if waits else None
+                        value = f"{value:.6f}" if value is not None else "NaN"
+                        wait.append(f'rag_model_wait_seconds{{{labels},quantile="{quantile}"}} {value}')
+                    wait.append(f'rag_model_wait_seconds_sum{{{labels}}} {queue.wait_total[priority]:.6f}')
+                    wait.append(f'rag_model_wait_seconds_count{{{labels}}} {queue.admitted[priority]}')
+
+        families = [
+            ("rag_model_queue_depth", "gauge", "Calls waiting for a model provider slot.", queue_depth),
+            ("rag_model_in_flight", "gauge", "Calls currently running against a model provider.", in_flight),
+            ("rag_model_calls_total", "counter", "Model calls by outcome.", calls),
+            ("rag_model_wait_seconds", "summary", "Queue wait time for admitted calls.", wait),
+        ]
+        lines = []
+        for name, kind, description, samples in families:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,130 @@
+import os
+import re
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from async_runner import inline_execution
+from typing import List, Dict, Any, Optional
+import logging
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+# pstats: cProfile 결정적 프로파일 (.prof, snakeviz / python -m pstats 로 열람)
+# speedscope: pyinstrument 샘플링 프로파일 (.speedscope.json, https://www.speedscope.app 로 열람)
+PROFILE_EXTENSIONS = {
+    "pstats": ".prof",
+    "speedscope": ".speedscope.json",
+}
+PROFILE_FORMATS = tuple(PROFILE_EXTENSIONS)
+_PROFILE_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,128}$")
+
+# cProfile은 동시에 하나만 활성화할 수 있으므로 프로파일링 구간을 직렬화
+_profile_lock = threading.Lock()
+
+def _new_profile_id(name: str) -> str:
+    """프로파일 id 생성 (시각-이름-무작위)"""
+    safe_name = re.sub(r"[^A-Za-z0-9_-]", "_", name)[:40]
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{uuid.uuid4().hex[:8]}"
+
+@contextmanager
+def profiled(name: str, fmt: str = "pstats", output_dir: str = "./profiles"):
+    """
+    with 블록 실행 구간을 프로파일링하고 파일로 저장
+
+    Args:
+        name: 프로파일 이름 (파일 이름에 포함)
+        fmt: "pstats" (cProfile) 또는 "speedscope" (pyinstrument 필요)
+        output_dir: 프로파일 저장 경로
+
+    with 블록 안의 RAGSystem/DocumentProcessor 동기 API 호출은 공유 이벤트 루프와 스레드 풀 대신
+    현재 스레드에서 인라인으로 실행되어 전체 처리 과정이 프로파일에 기록됨
+
+    Yields:
+        블록 종료 후 profile_id, path가 채워지는 dict
+        (다른 요청이 프로파일링 중이면 프로파일링 없이 실행하고 profile_id는 None)
+    """
+    if fmt not in PROFILE_EXTENSIONS:
+        raise ValueError(f"지원하지 않는 프로파일 형식: {fmt} (가능: {', '.join(PROFILE_FORMATS)})")
+    if fmt == "speedscope":
+        try:
+            from pyinstrument import Profiler
+            from pyinstrument.renderers import SpeedscopeRenderer
+        except ImportError:
+            raise ValueError("speedscope 형식은 pyinstrument 패키지가 필요합니다: pip install pyinstrument")
+
+    info: Dict[str, Any] = {"profile_id": None, "path": None}
+    if not _profile_lock.acquire(blocking=False):
+        logger.warning(f"다른 프로파일링이 진행 중이라 프로파일링 없이 실행합니다: {name}")
+        yield info
+        return
+
+    try:
+        if fmt == "pstats":
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = Profiler(interval=0.001)
+            profiler.start()
+
+        try:
+            # 프로파일러는 현재 스레드만 기록하므로 동기 API 호출을 이 스레드에서 인라인으로 실행
+            with inline_execution():
+                yield info
+        finally:
+            if fmt == "pstats":
+                profiler.disable()
+            else:
+                profiler.stop()
+
+            os.makedirs(output_dir, exist_ok=True)
+            profile_id = _new_profile_id(name)
+            path = os.path.join(output_dir, profile_id + PROFILE_EXTENSIONS[fmt])
+            if fmt == "pstats":
+                profiler.dump_stats(path)
+            else:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(profiler.output(renderer=SpeedscopeRenderer()))
+            info.update(profile_id=profile_id, path=path)
+            logger.info(f"프로파일 저장: {path}")
+    finally:
+        _profile_lock.release()
+
+def find_profile(profile_id: str, output_dir: str = "./profiles") -> Optional[str]:
+    """
+    프로파일 id에 해당하는 파일 이름 조회
+
+    Args:
+        profile_id: profiled()가 반환한 id
+        output_dir: 프로파일 저장 경로
+
+    Returns:
+        output_dir 안의 파일 이름 또는 None
+    """
+    if not _PROFILE_ID_RE.match(profile_id):
+        return None
+    for extension in PROFILE_EXTENSIONS.values():
+        filename = profile_id + extension
+        if os.path.exists(os.path.join(output_dir, filename)):
+            return filename
+    return None
+
+def list_profiles(output_dir: str = "./profiles") -> List[Dict[str, Any]]:
+    """저장된 프로파일 목록 (최신순)"""
+    if not os.path.isdir(output_dir):
+        return []
+    profiles = []
+    for filename in os.listdir(output_dir):
+        for fmt, extension in PROFILE_EXTENSIONS.items():
+            if filename.endswith(extension):
+                path = os.path.join(output_dir, filename)
+                profiles.append({
+                    "profile_id": filename[:-len(extension)],
+                    "format": fmt,
+                    "size_bytes": os.path.getsize(path),
+                    "created": os.path.getmtime(path)
+                })
+                break
+    return sorted(profiles, key=lambda p: p["created"], reverse=True)
@@ -1,22 +1,40 @@
 import os
-from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
-from document_processor import DocumentProcessor
+import asyncio
+import threading
+from typing import List, Dict, Any, Optional
+from document_processor import DocumentProcessor, file_sha256
 from vector_store import VectorStore
-from langchain_google_genai import ChatGoogleGenerativeAI
+from collection_manager import CollectionManager, CollectionNotFound
+from single_flight import SingleFlight
+from model_scheduler import ModelScheduler, SchedulerRejected, INTERACTIVE, BACKGROUND
+from async_runner import run_sync, offload, offload_ingest, is_inline
 
 import logging
 
 # 로깅 설정
 logger = logging.getLogger(__name__)
 
+def _normalize_question(question: str) -> str:
+    """질의 합치기용 질문 정규화 (공백 정리, 대소문자 무시)"""
+    return " ".join(question.split()).casefold()
+
+def _retrieve_exception(task: asyncio.Future):
+    """쓰이지 않고 끝난 태스크의 예외를 회수 (미회수 예외 경고 방지)"""
+    if not task.cancelled():
+        task.exception()
+
 class RAGSystem:
     """RAG(Retrieval-Augmented Generation) 시스템 메인 클래스"""
     
     def __init__(self, 
                  chunk_size: int = 1000, 
                  chunk_overlap: int = 50,
-                 db_path: str = "./vector_db"):
+                 db_path: str = "./vector_db",
+                 lazy_load: bool = False,
+                 max_memory_mb: Optional[float] = None,
+                 num_shards: int = 1,
+                 extraction_cache_dir: Optional[str] = None,
+                 scheduler: Optional[ModelScheduler] = None):
         """
         RAG 시스템 초기화
         
@@ -24,25 +42,161 @@ class RAGSystem:
             chunk_size: 청크 크기 (토큰 수)
             chunk_overlap: 청크 간 겹치는 토큰 수
             db_path: 벡터 DB 저장 경로
+            lazy_load: True이면 벡터 DB를 첫 사용 시점(또는 warm_up() 호출 시)에 로드
+            max_memory_mb: 메모리에 상주시킬 컬렉션들의 총 메모리 예산 (None이면 무제한)
+            num_shards: 컬렉션별 인덱스 샤드 수 (2 이상이면 샤드를 병렬 검색)
+            extraction_cache_dir: PDF 추출 결과 캐시 경로 (None이면 캐시 사용 안 함)
+            scheduler: LLM/임베딩 호출 스케줄러 (None이면 기본 설정으로 생성)
         """
-        self.document_processor = DocumentProcessor(chunk_size, chunk_overlap)
-        self.vector_store = VectorStore(db_path)
-        self.llm = ChatGoogleGenerativeAI(
-            model="models/gemini-2.5-pro",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.1,
-            max_output_tokens=1000
-        )
+        self.scheduler = scheduler or ModelScheduler()
+        self.document_processor = DocumentProcessor(chunk_size, chunk_overlap,
+                                                    extraction_cache_dir=extraction_cache_dir,
+                                                    scheduler=self.scheduler)
+        self.collections = CollectionManager(db_path, max_memory_mb=max_memory_mb,
+                                             num_shards=num_shards)
+        self._warmed_up = False
+        self._warmup_thread = None
+        self._warmup_lock = threading.Lock()
+        # 같은 코퍼스 버전에 대한 동일한 질문은 진행 중인 처리 하나를 공유
+        self.query_flight = SingleFlight("query")
+        # 질문 임베딩은 컬렉션 로드와 겹쳐 질의 합치기보다 먼저 시작하므로 정규화한 질문 기준으로 따로 합침
+        self.question_flight = SingleFlight("question_embedding")
+        # 같은 컬렉션에 같은 내용의 문서가 동시에 업로드되면 인제스트 하나를 공유
+        self.upload_flight = SingleFlight("upload")
+        if not lazy_load:
+            self.collections.get()
+        # LLM 클라이언트는 첫 질문 시 생성
+        self._llm = None
+        self._llm_lock = threading.Lock()
         logger.info("RAG 시스템 초기화 완료")
     
-    def add_document(self, file_path: str) -> Dict[str, Any]:
+    @property
+    def llm(self):
+        """LLM 클라이언트 (첫 접근 시 생성)"""
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                    self._llm = ChatGoogleGenerativeAI(
+                        model="models/gemini-2.5-pro",
+                        google_api_key=os.getenv("GOOGLE_API_KEY"),
+                        temperature=0.1,
+                        max_output_tokens=1000
+                    )
+        return self._llm
+    
+    @llm.setter
+    def llm(self, value):
+        # 진행 중인 생성(워밍업 등)이 끝난 뒤에 교체해야 생성된 클라이언트가 덮어쓰지 않음
+        with self._llm_lock:
+            self._llm = value
+    
+    @property
+    def vector_store(self) -> VectorStore:
+        """default 컬렉션의 VectorStore"""
+        return self.collections.get()
+    
+    def is_ready(self) -> bool:
+        """워밍업이 끝나 질의를 바로 처리할 수 있는지 여부 (이후 컬렉션 축출과 무관)"""
+        return self._warmed_up
+    
+    def warm_up(self, background: bool = False):
+        """
+        벡터 DB 로드와 클라이언트 생성을 미리 수행
+        
+        Args:
+            background: True이면 데몬 스레드에서 수행하고 스레드를 반환
+                        (이미 진행 중인 백그라운드 워밍업이 있으면 그 스레드를 반환)
+        """
+        if background:
+            with self._warmup_lock:
+                if self._warmup_thread is None or not self._warmup_thread.is_alive():
+                    self._warmup_thread = threading.Thread(target=self.warm_up, name="rag-warmup", daemon=True)
+                    self._warmup_thread.start()
+                return self._warmup_thread
+        
+        try:
+            self.collections.get()
+            self._warmed_up = True
+            self.document_processor.text_splitter
+            self.document_processor.embeddings
+            self.llm
+            logger.info("RAG 시스템 워밍업 완료")
+        except Exception as e:
+            logger.error(f"RAG 시스템 워밍업 실패: {e}")
+        return None
+    
+    def add_document(self,
+                     file_path: str,
+                     collection: Optional[str] = None,
+                     content_hash: Optional[str] = None,
+                     filename: Optional[str] = None) -> Dict[str, Any]:
+        """aadd_document()의 동기 버전 (공유 이벤트 루프에서 실행)"""
+        return run_sync(self.aadd_document(file_path, collection, content_hash, filename))
+    
+    async def aadd_document(self,
+                            file_path: str,
+                            collection: Optional[str] = None,
+                            content_hash: Optional[str] = None,
+                            filename: Optional[str] = None) -> Dict[str, Any]:
         """
-        문서를 벡터 DB에 추가
+        문서를 벡터 DB에 추가 (같은 내용의 문서가 이미 있으면 처리를 건너뜀)
+        
+        Args:
+            file_path: 문서 파일 경로
+            collection: 추가할 컬렉션 이름 (None이면 default)
+            content_hash: 파일 내용의 SHA-256 해시 (None이면 계산)
+            filename: 원본 파일 이름 (None이면 file_path의 파일 이름)
+        
+        해시 계산, 텍스트 추출, 청킹, 인덱스 저장은 인제스트 전용 스레드 풀에서 실행하고
+        임베딩은 클라이언트의 비동기 메서드로 호출.
+        같은 컬렉션에 같은 내용의 문서가 동시에 들어오면 한 번만 처리하고
+        나머지 요청은 중복 문서로 응답
         """
         try:
+            vector_store = await offload_ingest(self.collections.get, collection)
+            content_hash = content_hash or await offload_ingest(file_sha256, file_path)
+        except Exception as e:
+            logger.error(f"문서 추가 실패: {e}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "file_path": file_path
+            }
+        
+        ingested_here = False
+        
+        async def ingest():
+            nonlocal ingested_here
+            ingested_here = True
+            return await self._aingest(file_path, vector_store, collection, content_hash, filename)
+        
+        result = await self.upload_flight.ado((vector_store.db_path, content_hash), ingest)
+        if not ingested_here and result["status"] == "success":
+            result = dict(result, duplicate=True)
+        return result
+    
+    async def _aingest(self, file_path: str, vector_store: VectorStore, collection: Optional[str],
+                       content_hash: str, filename: Optional[str]) -> Dict[str, Any]:
+        """중복 확인, 텍스트 추출, 청킹, 임베딩, 저장 (aadd_document()의 실제 처리)"""
+        try:
+            # 0. 중복 문서 확인 (VectorStore 잠금을 잡으므로 이벤트 루프 밖에서 실행)
+            existing = await offload_ingest(vector_store.find_document, content_hash)
+            if existing:
+                logger.info(f"이미 추가된 문서입니다: {existing['filename']} ({content_hash[:12]})")
+                return {
+                    "status": "success",
+                    "duplicate": True,
+                    "file_path": existing["source"],
+                    "content_hash": content_hash,
+                    "chunks_created": existing["chunks"],
+                    "total_tokens": existing["total_tokens"],
+                    "vector_db_stats": await offload_ingest(vector_store.get_stats)
+                }
+            
             # 1. 텍스트 추출
             logger.info(f"문서 텍스트 추출 시작: {file_path}")
-            text = self.document_processor.extract_text(file_path)
+            text = await self.document_processor.aextract_text(file_path, content_hash)
             logger.info(f"추출된 텍스트 길이: {len(text)}자")
             
             # 텍스트 검증
@@ -56,13 +210,15 @@ class RAGSystem:
             # 2. 메타데이터 생성
             metadata = {
                 "source": file_path,
+                "filename": filename or os.path.basename(file_path),
+                "content_hash": content_hash,
                 "file_type": file_path.split('.')[-1].lower(),
                 "text_length": len(text)
             }
             
             # 3. 텍스트 청킹
             logger.info("텍스트 청킹 시작")
-            documents = self.document_processor.split_text(text, metadata)
+            documents = await self.document_processor.asplit_text(text, metadata)
             logger.info(f"생성된 청크 개수: {len(documents)}")
             
             # 청크 내용 확인 (디버깅용)
@@ -72,20 +228,23 @@ class RAGSystem:
             # 4. 임베딩 생성
             logger.info("임베딩 생성 시작")
             texts = [doc.page_content for doc in documents]
-            embeddings = self.document_processor.get_embeddings(texts)
+            embeddings = await self.document_processor.aget_embeddings(texts, priority=BACKGROUND)
             logger.info(f"생성된 임베딩 개수: {len(embeddings)}")
             
             # 5. 벡터 DB에 저장
             logger.info("벡터 DB에 저장 시작")
-            self.vector_store.add_documents(documents, embeddings)
+            await offload_ingest(vector_store.add_documents, documents, embeddings)
+            await offload_ingest(self.collections.enforce_budget, keep=collection)
             
             # 저장 후 상태 확인
-            stats = self.vector_store.get_stats()
+            stats = await offload_ingest(vector_store.get_stats)
             logger.info(f"저장 후 벡터DB 상태: 총 문서 {stats['total_documents']}개, 인덱스 크기 {stats['index_size']}")
             
             result = {
                 "status": "success",
+                "duplicate": False,
                 "file_path": file_path,
+                "content_hash": content_hash,
                 "chunks_created": len(documents),
                 "total_tokens": sum(len(text.split()) for text in texts),
                 "vector_db_stats": stats
@@ -94,6 +253,14 @@ class RAGSystem:
             logger.info(f"문서 추가 완료: {result}")
             return result
             
+        except SchedulerRejected as e:
+            logger.warning(f"문서 추가 거절: {e}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "retry_after": e.retry_after,
+                "file_path": file_path
+            }
         except Exception as e:
             logger.error(f"문서 추가 실패: {e}")
             return {
@@ -102,34 +269,94 @@ class RAGSystem:
                 "file_path": file_path
             }
     
-    def query(self, question: str, k: int = None) -> Dict[str, Any]:
+    def query(self, question: str, k: int = None, collection: Optional[str] = None) -> Dict[str, Any]:
+        """aquery()의 동기 버전 (공유 이벤트 루프에서 실행)"""
+        return run_sync(self.aquery(question, k, collection))
+    
+    async def aquery(self, question: str, k: int = None, collection: Optional[str] = None) -> Dict[str, Any]:
         """
         질문에 대한 답변 생성
+        
+        Args:
+            question: 질문
+            k: 검색할 문서 수 (None이면 컬렉션 전체)
+            collection: 검색할 컬렉션 이름 (None이면 default, 없는 컬렉션이면 not_found 오류)
+        
+        질문 임베딩은 컬렉션 로드와 겹쳐 바로 시작하고, 검색은 스레드 풀에서,
+        LLM 호출은 클라이언트의 비동기 메서드로 실행.
+        같은 컬렉션/코퍼스 버전에 같은 질문(정규화 기준)이 동시에 들어오면
+        임베딩, 검색, LLM 호출을 한 번만 수행하고 결과를 공유
         """
+        embed_task = asyncio.ensure_future(self._aembed_question(question))
+        embed_task.add_done_callback(_retrieve_exception)
+        try:
+            try:
+                # 질의는 컬렉션을 만들지 않음 (이름을 잘못 쓴 질의가 빈 컬렉션을 남기지 않도록)
+                vector_store = await offload(self.collections.get, collection, False)
+            except CollectionNotFound as e:
+                return {
+                    "status": "error",
+                    "error": str(e),
+                    "not_found": True,
+                    "question": question
+                }
+            except Exception as e:
+                logger.error(f"질문 답변 실패: {e}")
+                return {
+                    "status": "error",
+                    "error": str(e),
+                    "question": question
+                }
+            
+            key = (vector_store.db_path, vector_store.version, _normalize_question(question), k)
+            result = await self.query_flight.ado(key, self._aanswer, question, k, vector_store, embed_task)
+            if result.get("question") != question:
+                result = dict(result, question=question)
+            return result
+        finally:
+            # 빈 컬렉션이거나 진행 중인 동일 질문에 합류한 경우 임베딩은 쓰이지 않음
+            embed_task.cancel()
+    
+    async def _aembed_question(self, question: str) -> List[List[float]]:
+        """질문 임베딩 (공백/대소문자만 다른 질문이 동시에 들어오면 공급자 호출 하나를 공유)"""
+        return await self.question_flight.ado(_normalize_question(question),
+                                              self.document_processor.aget_embeddings, [question])
+    
+    async def _ainvoke_llm(self, prompt: str):
+        """LLM 클라이언트의 비동기 메서드 호출 (없거나 인라인 실행 중이면 동기 메서드 실행)"""
+        llm = self.llm
+        if hasattr(llm, "ainvoke") and not is_inline():
+            return await llm.ainvoke(prompt)
+        return await offload(llm.invoke, prompt)
+    
+    async def _aanswer(self, question: str, k: Optional[int], vector_store: VectorStore,
+                       embed_task: asyncio.Future) -> Dict[str, Any]:
+        """질문 임베딩 대기, 문서 검색, LLM 답변 생성 (aquery()의 실제 처리)"""
         try:
-            # 벡터DB 상태 확인
-            stats = self.vector_store.get_stats()
+            # 벡터DB 상태 확인 (VectorStore 잠금을 잡으므로 이벤트 루프 밖에서 실행)
+            stats = await offload(vector_store.get_stats)
             logger.info(f"벡터DB 상태: 총 문서 {stats['total_documents']}개, 인덱스 크기 {stats['index_size']}")
             
             if stats['total_documents'] == 0:
                 logger.warning("벡터DB에 문서가 없습니다. 일반 챗봇 모드로 동작합니다.")
+                embed_task.cancel()
                 prompt = question
                 documents, metadata_list, scores = [], [], []
             else:
-                # 1. 질문 임베딩 생성
-                logger.info(f"질문 임베딩 생성: {question}")
-                question_embedding = self.document_processor.get_embeddings([question])[0]
+                # 1. 질문 임베딩 (aquery()에서 미리 시작한 결과 대기)
+                logger.info(f"질문 임베딩 대기: {question}")
+                question_embedding = (await embed_task)[0]
                 
                 # 2. 관련 문서 검색
                 logger.info("관련 문서 검색 시작")
                 if k is None:
                     k = stats['total_documents']
-                documents, metadata_list, scores = self.vector_store.search(question_embedding, k)
+                documents, metadata_list, scores = await offload(vector_store.search, question_embedding, k)
                 logger.info(f"검색된 문서 개수: {len(documents)}")
                 
                 # 검색된 문서 내용 로깅 (디버깅용)
-                for i, doc in enumerate(documents):
-                    #logger.info(f"검색된 문서 {i+1}: {doc[:200]}...")
+                #for i, doc in enumerate(documents):
+                #    logger.info(f"검색된 문서 {i+1}: {doc[:200]}...")
                 
                 # 3. 벡터 DB가 비어있으면 context 없이 LLM에게 질문만 전달
                 if not documents:
@@ -144,7 +371,10 @@ class RAGSystem:
             # 5. LLM으로 답변 생성
             logger.info("LLM으로 답변 생성 시작")
             logger.info(f"프롬프트 길이: {len(prompt)}자")
-            response = self.llm.invoke(prompt)
+            if self._llm is None:
+                # 첫 질문의 모듈 import와 클라이언트 생성이 이벤트 루프를 막지 않도록 스레드 풀에서 수행
+                await offload(getattr, self, "llm")
+            response = await self.scheduler.arun("llm", INTERACTIVE, self._ainvoke_llm, prompt)
             answer = response.content
             
             result = {
@@ -161,6 +391,14 @@ class RAGSystem:
             logger.info(f"질문 답변 완료: {len(answer)}자")
             return result
             
+        except SchedulerRejected as e:
+            logger.warning(f"질문 답변 거절: {e}")
+            return {
+                "status": "error",
+                "error": str(e),
+                "retry_after": e.retry_after,
+                "question": question
+            }
         except Exception as e:
             logger.error(f"질문 답변 실패: {e}")
             return {
@@ -169,16 +407,43 @@ class RAGSystem:
                 "question": question
             }
     
-    def get_stats(self) -> Dict[str, Any]:
-        """시스템 통계 정보 반환"""
-        vector_stats = self.vector_store.get_stats()
+    def get_stats(self, collection: Optional[str] = None) -> Dict[str, Any]:
+        """
+        시스템 통계 정보 반환
+        
+        Args:
+            collection: vector_store 항목에 표시할 컬렉션 이름 (None이면 default,
+                        메모리에 없는 컬렉션은 로드하지 않고 디스크 기준으로 표시)
+        
+        Raises:
+            CollectionNotFound: 존재하지 않는 컬렉션
+        """
+        vector_stats = self.collections.collection_stats(collection)
+        extraction_cache = self.document_processor.extraction_cache
         return {
             "vector_store": vector_stats,
+            "collections": self.collections.get_stats(),
+            "extraction_cache": extraction_cache.get_stats() if extraction_cache else None,
+            "scheduler": self.scheduler.get_stats(),
+            "coalescing": {
+                "query": self.query_flight.get_stats(),
+                "question_embedding": self.question_flight.get_stats(),
+                "upload": self.upload_flight.get_stats(),
+                "embedding": self.document_processor.embedding_flight.get_stats()
+            },
             "chunk_size": self.document_processor.chunk_size,
             "chunk_overlap": self.document_processor.chunk_overlap
         }
     
-    def clear_database(self):
-        """벡터 DB 초기화"""
-        self.vector_store.clear()
-        logger.info("벡터 DB 초기화 완료") 
\ No newline at end of file
+    def clear_database(self, collection: Optional[str] = None):
+        """
+        벡터 DB 초기화 (지정한 컬렉션만)
+        
+        Args:
+            collection: 초기화할 컬렉션 이름 (None이면 default)
+        
+        Raises:
+            CollectionNotFound: 존재하지 않는 컬렉션
+        """
+        self.collections.clear(collection)
+        logger.info(f"벡터 DB 초기화 완료: {collection or 'default'}") 
\ No newline at end of file
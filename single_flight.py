@@ -0,0 +1,112 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+import logging
+
+# 로깅 설정
+logger = logging.getLogger(__name__)
+
+class _Call:
+    """진행 중인 호출 1건 (결과를 기다리는 요청들이 공유)"""
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.waiters = []  # 대기자 (이벤트 루프, future)
+
+    @property
+    def cancelled(self) -> bool:
+        """실행하던 쪽이 취소되어 결과 없이 끝났는지 여부 (대기자는 다시 시도)"""
+        return isinstance(self.error, asyncio.CancelledError)
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출을 하나로 합쳐 실행하고 결과를 모든 대기자에게 돌려주는 클래스"""
+
+    def __init__(self, name: str = "single_flight"):
+        """
+        SingleFlight 초기화
+
+        Args:
+            name: 통계/로그에 표시할 이름
+        """
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.total_calls = 0
+        self.coalesced_calls = 0
+
+    async def ado(self, key: Hashable, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        key에 대해 진행 중인 호출이 있으면 그 결과를 기다리고, 없으면 func를 실행
+        (대기자는 스레드를 막지 않고 이벤트 루프에서 기다림)
+
+        Args:
+            key: 호출을 구분하는 키 (같은 키의 동시 호출은 한 번만 실행)
+            func: 코루틴 함수
+
+        Returns:
+            func의 반환값 (대기자들은 같은 객체를 받으므로 수정하지 말 것)
+        """
+        loop = asyncio.get_running_loop()
+        first = True
+        while True:
+            with self._lock:
+                call, leader = self._join(key, first)
+                if not leader:
+                    future = loop.create_future()
+                    call.waiters.append((loop, future))
+            first = False
+            if leader:
+                break
+            logger.info(f"{self.name}: 진행 중인 동일 요청에 합류")
+            await future
+            if call.cancelled:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = await func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+
+    def _join(self, key: Hashable, count: bool):
+        """진행 중인 호출에 합류하거나 새 호출 등록 (self._lock 보유 상태에서 호출)"""
+        if count:
+            self.total_calls += 1
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call()
+            self._calls[key] = call
+            return call, True
+        if count:
+            self.coalesced_calls += 1
+        return call, False
+
+    def _finish(self, key: Hashable, call: _Call):
+        """호출 종료를 대기자들에게 알림 (각 대기자의 이벤트 루프에서 깨움)"""
+        with self._lock:
+            del self._calls[key]
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """전체 호출 수, 합쳐진 호출 수, 진행 중인 호출 수 반환"""
+        with self._lock:
+            return {
+                "total_calls": self.total_calls,
+                "coalesced_calls": self.coalesced_calls,
+                "in_flight": len(self._calls)
+            }
+
+def _wake(future: asyncio.Future):
+    """대기 중인 future 완료 (대기자가 이미 취소된 경우 무시)"""
+    if not future.done():
+        future.set_result(None)
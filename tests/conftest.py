@@ -0,0 +1,36 @@
+import os
+import sys
+import pytest
+
+# 저장소 루트의 모듈을 import 할 수 있도록 경로 추가
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def rag(tmp_path):
+    """가짜 임베딩/LLM과 오프라인 토크나이저를 쓰는 RAGSystem"""
+    from rag_system import RAGSystem
+    from model_scheduler import ModelScheduler
+    from fake_providers import install_fake_providers
+
+    rag = RAGSystem(chunk_size=50, chunk_overlap=5, db_path=str(tmp_path / "db"),
+                    scheduler=ModelScheduler({"llm": 8, "embedding": 8}))
+    install_fake_providers(rag, embed_latency=0.05, llm_latency=0.05, offline_tokenizer=True)
+    return rag
+
+
+@pytest.fixture
+def client(rag, tmp_path, monkeypatch):
+    """rag 픽스처를 사용하는 flask_app 테스트 클라이언트 (업로드 폴더는 임시 경로)"""
+    monkeypatch.setenv("RAG_WARMUP", "0")
+    monkeypatch.setenv("VECTOR_DB_PATH", str(tmp_path / "import_db"))
+    monkeypatch.setenv("EXTRACTION_CACHE_DIR", "")
+    monkeypatch.chdir(tmp_path)
+    import flask_app
+
+    upload_folder = tmp_path / "uploads"
+    upload_folder.mkdir(exist_ok=True)
+    monkeypatch.setattr(flask_app, "rag", rag)
+    monkeypatch.setattr(flask_app, "UPLOAD_FOLDER", str(upload_folder))
+    monkeypatch.setitem(flask_app.app.config, "UPLOAD_FOLDER", str(upload_folder))
+    return flask_app.app.test_client()
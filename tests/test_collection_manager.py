@@ -0,0 +1,73 @@
+import pytest
+import numpy as np
+from langchain.schema import Document
+from collection_manager import CollectionManager
+from vector_store import VectorStore
+
+
+def _add(store: VectorStore, filename: str, seed: int):
+    """파일 하나 분량의 청크 2개를 추가"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((2, 768)).astype(np.float32)
+    documents = [Document(page_content=f"{filename} {i}", metadata={"filename": filename})
+                 for i in range(2)]
+    store.add_documents(documents, vectors)
+
+
+def _filenames(store: VectorStore):
+    return sorted({meta["filename"] for meta in store.metadata})
+
+
+def test_evicted_store_in_use_is_reused(tmp_path):
+    manager = CollectionManager(str(tmp_path), max_memory_mb=0.001)
+    _add(manager.get("a"), "seed.txt", 0)
+
+    # 업로드가 진행 중인 것처럼 a의 참조를 잡은 채 b를 사용해 a를 축출
+    in_flight = manager.get("a")
+    manager.get("b")
+    assert not manager.is_resident("a")
+
+    # 다음 요청은 디스크에서 두 번째 객체를 만들지 않고 같은 객체를 받아야 함
+    assert manager.get("a") is in_flight
+    _add(in_flight, "slow.txt", 1)
+    _add(manager.get("a"), "other.txt", 2)
+
+    reloaded = VectorStore(str(tmp_path / "collections" / "a"))
+    assert _filenames(reloaded) == ["other.txt", "seed.txt", "slow.txt"]
+
+
+def test_evicted_store_without_references_is_released(tmp_path):
+    manager = CollectionManager(str(tmp_path), max_memory_mb=0.001)
+    _add(manager.get("a"), "seed.txt", 0)
+    manager.get("b")
+
+    assert "a" not in manager._evicted
+    assert manager.evictions == 1
+    assert _filenames(manager.get("a")) == ["seed.txt"]
+
+
+def test_lookups_do_not_create_collections(tmp_path):
+    from collection_manager import CollectionNotFound
+    manager = CollectionManager(str(tmp_path))
+
+    with pytest.raises(CollectionNotFound):
+        manager.get("typo", create=False)
+    with pytest.raises(CollectionNotFound):
+        manager.collection_stats("typo")
+    with pytest.raises(CollectionNotFound):
+        manager.clear("typo")
+
+    assert not manager.exists("typo")
+    assert manager.list_collections() == ["default"]
+
+
+def test_stats_of_non_resident_collection_come_from_disk(tmp_path):
+    manager = CollectionManager(str(tmp_path), max_memory_mb=0.001)
+    _add(manager.get("a"), "seed.txt", 0)
+    manager.get("b")
+
+    stats = manager.collection_stats("a")
+
+    assert stats["resident"] is False and stats["disk_bytes"] > 0
+    assert not manager.is_resident("a")
+    assert manager.collection_stats("b")["resident"] is True
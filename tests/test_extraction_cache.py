@@ -0,0 +1,62 @@
+from document_processor import DocumentProcessor
+from extraction_cache import ExtractionCache
+
+OPTIONS = {"layout": True, "x_tolerance": 3, "y_tolerance": 3}
+
+
+def test_hit_after_put_and_miss_before(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+
+    assert cache.get("abc", "pdfplumber", 1, OPTIONS) is None
+    cache.put("abc", "pdfplumber", 1, OPTIONS, ["page 1", ""])
+
+    assert cache.get("abc", "pdfplumber", 1, OPTIONS) == ["page 1", ""]
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_key_changes_with_options_and_version(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    cache.put("abc", "pdfplumber", 1, OPTIONS, ["page 1"])
+
+    assert cache.get("abc", "pdfplumber", 1, dict(OPTIONS, x_tolerance=1)) is None
+    assert cache.get("abc", "pdfplumber", 2, OPTIONS) is None
+    assert cache.get("abd", "pdfplumber", 1, OPTIONS) is None
+
+
+def _processor(tmp_path, pages, complete):
+    processor = DocumentProcessor(extraction_cache_dir=str(tmp_path / "cache"))
+    calls = []
+
+    def extract_pages(file_path):
+        calls.append(file_path)
+        return pages, complete
+
+    processor._extract_pdf_pages = extract_pages
+    return processor, calls
+
+
+def test_processor_reuses_cached_pages_until_extractor_version_changes(tmp_path, monkeypatch):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF fake")
+    processor, calls = _processor(tmp_path, ["첫 페이지", "둘째 페이지"], complete=True)
+
+    first = processor.extract_text_from_pdf(str(path))
+    assert processor.extract_text_from_pdf(str(path)) == first
+    assert len(calls) == 1
+
+    monkeypatch.setattr(DocumentProcessor, "PDF_EXTRACTOR_VERSION", DocumentProcessor.PDF_EXTRACTOR_VERSION + 1)
+    processor.extract_text_from_pdf(str(path))
+    assert len(calls) == 2
+
+
+def test_failed_page_is_not_cached(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF fake")
+    processor, calls = _processor(tmp_path, ["첫 페이지", ""], complete=False)
+
+    processor.extract_text_from_pdf(str(path))
+    processor.extract_text_from_pdf(str(path))
+
+    assert len(calls) == 2
+    assert processor.extraction_cache.get_stats()["entries"] == 0
@@ -0,0 +1,50 @@
+def test_unknown_collection_returns_404_without_creating_it(client, rag):
+    assert client.post('/api/query', json={'question': '질문', 'collection': 'typo'}).status_code == 404
+    assert client.get('/api/stats?collection=typo').status_code == 404
+    assert client.post('/api/clear', json={'collection': 'typo'}).status_code == 404
+
+    assert client.get('/api/collections').get_json()['collections'].keys() == {'default'}
+    assert not rag.collections.exists('typo')
+
+
+def _upload(client, name, content, collection='docs'):
+    import io
+    return client.post('/api/upload', data={'file': (io.BytesIO(content), name), 'collection': collection},
+                       content_type='multipart/form-data')
+
+
+def test_failed_ingest_removes_the_stored_upload(client, tmp_path):
+    uploads = tmp_path / 'uploads'
+
+    assert _upload(client, 'empty.txt', b'').status_code == 500
+    assert list(uploads.iterdir()) == []
+
+    assert _upload(client, 'doc.txt', '사과 바나나 포도 '.encode('utf-8') * 100).status_code == 200
+    assert len(list(uploads.iterdir())) == 1
+
+
+def test_oversized_upload_reports_fractional_limit(client, tmp_path, monkeypatch):
+    import flask_app
+    monkeypatch.setattr(flask_app, 'MAX_UPLOAD_MB', 0.001)
+    monkeypatch.setattr(flask_app, 'MAX_UPLOAD_BYTES', 1048)
+
+    response = _upload(client, 'big.txt', b'x' * 4096)
+
+    assert response.status_code == 413
+    assert '0.001MB' in response.get_json()['error']
+    assert list((tmp_path / 'uploads').iterdir()) == []
+
+
+def test_only_the_upload_endpoint_streams_into_the_upload_folder(client, tmp_path):
+    import io
+    import flask_app
+    from flask import request
+
+    big = b'x' * (600 * 1024)  # 메모리 대신 임시 파일로 받는 크기
+    with flask_app.app.test_request_context('/api/query', method='POST', content_type='multipart/form-data',
+                                            data={'file': (io.BytesIO(big), 'a.txt')}):
+        assert not isinstance(request.files['file'].stream, flask_app.HashingUploadFile)
+        assert list((tmp_path / 'uploads').iterdir()) == []
+    with flask_app.app.test_request_context('/api/upload', method='POST', content_type='multipart/form-data',
+                                            data={'file': (io.BytesIO(big), 'a.txt')}):
+        assert isinstance(request.files['file'].stream, flask_app.HashingUploadFile)
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from model_scheduler import ModelScheduler, SchedulerRejected, INTERACTIVE, BACKGROUND
+
+
+def test_interactive_calls_jump_the_queue_and_full_queue_rejects():
+    scheduler = ModelScheduler({"x": 1}, max_queue=2)
+    order = []
+
+    async def job(name):
+        order.append(name)
+        await asyncio.sleep(0.05)
+
+    async def call(priority, name):
+        try:
+            await scheduler.arun("x", priority, job, name)
+        except SchedulerRejected as e:
+            assert e.retry_after >= 1
+            order.append(f"rejected {name}")
+
+    async def main():
+        await asyncio.gather(call(BACKGROUND, "b0"), call(BACKGROUND, "b1"), call(BACKGROUND, "b2"),
+                             call(BACKGROUND, "b3"), call(INTERACTIVE, "i0"))
+
+    asyncio.run(main())
+
+    assert order == ["b0", "rejected b3", "i0", "b1", "b2"]
+    stats = scheduler.get_stats()["x"]
+    assert stats["in_flight"] == 0
+    assert stats["priorities"]["background"]["rejected"] == 1
+
+
+def test_deadline_and_cancellation_leave_the_queue_clean():
+    scheduler = ModelScheduler({"x": 1}, deadlines={INTERACTIVE: 0.05})
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        return "done"
+
+    async def main():
+        running = asyncio.ensure_future(scheduler.arun("x", BACKGROUND, slow))
+        await asyncio.sleep(0.01)
+        with pytest.raises(SchedulerRejected):
+            await scheduler.arun("x", INTERACTIVE, slow)
+        cancelled = asyncio.ensure_future(scheduler.arun("x", BACKGROUND, slow))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        assert await running == "done"
+        return await scheduler.arun("x", BACKGROUND, slow)
+
+    assert asyncio.run(main()) == "done"
+    stats = scheduler.get_stats()["x"]["priorities"]
+    assert stats["interactive"]["timed_out"] == 1
+    assert stats["background"]["queue_depth"] == 0
+
+
+def test_prometheus_metrics_group_each_family():
+    scheduler = ModelScheduler({"llm": 1, "embedding": 1})
+
+    async def job():
+        await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*[scheduler.arun("llm", INTERACTIVE, job) for _ in range(3)])
+
+    asyncio.run(main())
+    text = scheduler.prometheus_metrics()
+
+    families = []
+    for line in text.splitlines():
+        name = line.split()[2] if line.startswith("#") else line.split("{")[0]
+        for suffix in ("_sum", "_count"):
+            if name.endswith(suffix) and name[:-len(suffix)] == families[-1]:
+                name = families[-1]
+        if not families or families[-1] != name:
+            families.append(name)
+    assert len(families) == len(set(families)) == 4
+    assert "# TYPE rag_model_wait_seconds summary" in text
+    assert 'rag_model_wait_seconds_count{provider="llm",priority="interactive"} 3' in text
+    assert 'rag_model_wait_seconds{provider="embedding",priority="background",quantile="0.99"} NaN' in text
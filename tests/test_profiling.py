@@ -0,0 +1,21 @@
+import pstats
+from profiling import profiled
+
+
+def _profiled_functions(path):
+    return {func for _, _, func in pstats.Stats(path).stats}
+
+
+def test_profiled_sync_calls_record_the_whole_pipeline(rag, tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("사과 바나나 포도 " * 200, encoding="utf-8")
+
+    with profiled("upload", "pstats", str(tmp_path / "profiles")) as upload_info:
+        assert rag.add_document(str(path))["status"] == "success"
+    with profiled("query", "pstats", str(tmp_path / "profiles")) as query_info:
+        assert rag.query("사과는 무슨 색?", k=2)["status"] == "success"
+
+    upload_functions = _profiled_functions(upload_info["path"])
+    assert {"extract_text", "split_text", "embed_documents", "add_documents"} <= upload_functions
+    query_functions = _profiled_functions(query_info["path"])
+    assert {"search", "embed_documents", "invoke"} <= query_functions
@@ -0,0 +1,128 @@
+import asyncio
+
+
+def test_concurrent_identical_uploads_are_ingested_once(rag, tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("사과 바나나 포도 " * 200, encoding="utf-8")
+
+    async def upload_many():
+        return await asyncio.gather(*[rag.aadd_document(str(path), collection="c") for _ in range(5)])
+
+    results = asyncio.run(upload_many())
+
+    assert all(r["status"] == "success" for r in results)
+    assert sorted(r["duplicate"] for r in results) == [False, True, True, True, True]
+    store = rag.collections.get("c")
+    assert len(store.documents) == results[0]["chunks_created"]
+    assert rag.upload_flight.get_stats()["coalesced_calls"] == 4
+
+
+def test_question_spellings_share_one_embedding_call(rag, tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("사과 바나나 포도 " * 200, encoding="utf-8")
+    rag.add_document(str(path))
+    before = rag.scheduler.get_stats()["embedding"]["priorities"]["interactive"]["admitted"]
+
+    async def ask_many():
+        questions = ["사과는 무슨 색?", "  사과는   무슨 색?  "] * 10
+        return await asyncio.gather(*[rag.aquery(q, k=2) for q in questions])
+
+    results = asyncio.run(ask_many())
+
+    assert all(r["status"] == "success" for r in results)
+    stats = rag.scheduler.get_stats()
+    assert stats["embedding"]["priorities"]["interactive"]["admitted"] - before == 1
+    assert stats["llm"]["priorities"]["interactive"]["admitted"] == 1
+
+
+def test_llm_client_is_built_off_the_event_loop(rag, tmp_path, monkeypatch):
+    import threading
+    import langchain_google_genai
+    from fake_providers import FakeChatModel
+
+    built_on = []
+
+    class RecordingChatModel(FakeChatModel):
+        def __init__(self, **kwargs):
+            super().__init__()
+            built_on.append(threading.current_thread().name)
+
+    monkeypatch.setattr(langchain_google_genai, "ChatGoogleGenerativeAI", RecordingChatModel)
+    rag.llm = None
+
+    result = rag.query("사과는 무슨 색?")
+
+    assert result["status"] == "success"
+    assert len(built_on) == 1 and built_on[0] != "rag-event-loop"
+
+
+def test_slow_ingests_do_not_starve_query_threads(rag, tmp_path):
+    import time
+    path = tmp_path / "doc.txt"
+    path.write_text("사과 바나나 포도 " * 200, encoding="utf-8")
+    rag.add_document(str(path))
+    extract_text = rag.document_processor.extract_text
+
+    def slow_extract(file_path, content_hash=None):
+        time.sleep(0.5)
+        return extract_text(file_path, content_hash)
+
+    rag.document_processor.extract_text = slow_extract
+
+    async def main():
+        # 서로 다른 문서로 취급되도록 해시를 다르게 지정한 업로드로 스레드를 채운 뒤 질의
+        uploads = [asyncio.ensure_future(rag.aadd_document(str(path), content_hash=f"slow-{i}"))
+                   for i in range(12)]
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        result = await rag.aquery("사과는 무슨 색?", k=2)
+        elapsed = time.perf_counter() - start
+        await asyncio.gather(*uploads)
+        return result, elapsed
+
+    result, elapsed = asyncio.run(main())
+
+    assert result["status"] == "success"
+    assert elapsed < 0.4
+
+
+def test_locked_collection_does_not_stall_other_collections(rag, tmp_path):
+    import time
+    import threading
+    path = tmp_path / "doc.txt"
+    path.write_text("사과 바나나 포도 " * 200, encoding="utf-8")
+    rag.add_document(str(path), collection="a")
+    rag.add_document(str(path), collection="b")
+    other = tmp_path / "other.txt"
+    other.write_text("자동차 기차 비행기 " * 200, encoding="utf-8")
+
+    # a 컬렉션에 긴 쓰기가 진행 중인 상황 (업로드의 중복 확인과 통계 조회가 잠금을 기다림)
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_write_lock():
+        with rag.collections.get("a")._rw_lock.write():
+            locked.set()
+            release.wait(2)
+
+    holder = threading.Thread(target=hold_write_lock)
+    holder.start()
+    assert locked.wait(5)
+
+    async def main():
+        # 이벤트 루프가 잠금을 기다리며 멈추면 질의 시작부터 늦어지므로 업로드 시작 전부터 측정
+        start = time.perf_counter()
+        upload = asyncio.ensure_future(rag.aadd_document(str(other), collection="a"))
+        await asyncio.sleep(0.1)
+        result = await rag.aquery("사과는 무슨 색?", k=2, collection="b")
+        elapsed = time.perf_counter() - start
+        release.set()
+        return result, elapsed, await upload
+
+    try:
+        result, elapsed, upload = asyncio.run(main())
+    finally:
+        release.set()
+        holder.join()
+
+    assert result["status"] == "success" and upload["status"] == "success"
+    assert elapsed < 0.6
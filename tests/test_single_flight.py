@@ -0,0 +1,73 @@
+import asyncio
+from single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def main():
+        return await asyncio.gather(*[flight.ado("k", work, i) for i in range(10)])
+
+    assert asyncio.run(main()) == [0] * 10
+    assert calls == [0]
+    assert flight.get_stats() == {"total_calls": 10, "coalesced_calls": 9, "in_flight": 0}
+
+
+def test_waiters_retry_when_leader_is_cancelled():
+    flight = SingleFlight("test")
+
+    async def work(value):
+        await asyncio.sleep(0.05)
+        return value
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("k", work, 1))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(flight.ado("k", work, 2))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(main()) == 2
+
+
+def test_identical_embedding_requests_share_one_provider_call(rag):
+    processor = rag.document_processor
+
+    async def main():
+        return await asyncio.gather(*[processor.aget_embeddings(["같은 문장", "두 번째"]) for _ in range(5)])
+
+    results = asyncio.run(main())
+
+    assert all(r == results[0] for r in results)
+    assert rag.scheduler.get_stats()["embedding"]["priorities"]["interactive"]["admitted"] == 1
+    assert processor.embedding_flight.get_stats()["coalesced_calls"] == 4
+
+
+def test_queries_are_not_shared_across_corpus_versions(rag, tmp_path):
+    first = tmp_path / "first.txt"
+    first.write_text("사과 바나나 포도 " * 200, encoding="utf-8")
+    second = tmp_path / "second.txt"
+    second.write_text("자동차 기차 비행기 " * 200, encoding="utf-8")
+    rag.add_document(str(first))
+
+    rag.llm.latency = 0.5
+
+    async def main():
+        # 첫 질문이 진행 중인 동안 문서가 추가되면 같은 질문이라도 새 코퍼스로 다시 처리해야 함
+        before = asyncio.ensure_future(rag.aquery("무엇이 있나요?", k=2))
+        await asyncio.sleep(0.1)
+        await rag.aadd_document(str(second))
+        after = await rag.aquery("무엇이 있나요?", k=2)
+        return await before, after
+
+    before, after = asyncio.run(main())
+
+    assert rag.query_flight.get_stats()["coalesced_calls"] == 0
+    assert after["vector_db_stats"]["total_documents"] > before["vector_db_stats"]["total_documents"]
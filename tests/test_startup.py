@@ -0,0 +1,48 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# import 시점과 레디니스를 새 프로세스에서 확인 (테스트 프로세스에는 이미 무거운 모듈이 로드되어 있음)
+CHILD_CODE = r'''
+import sys, time, json
+import flask_app
+heavy = ['langchain', 'langchain_google_genai', 'faiss', 'pdfplumber', 'tiktoken']
+loaded = [m for m in heavy if m in sys.modules]
+client = flask_app.app.test_client()
+health = client.get('/api/health').status_code
+ready = [client.get('/api/ready').status_code]
+deadline = time.time() + 60
+while ready[-1] != 200 and time.time() < deadline:
+    time.sleep(0.01)
+    ready.append(client.get('/api/ready').status_code)
+print(json.dumps({'loaded': loaded, 'health': health, 'ready_first': ready[0], 'ready_last': ready[-1]}))
+'''
+
+
+def _start(tmp_path, warmup: str):
+    env = dict(os.environ, PYTHONPATH=ROOT, RAG_WARMUP=warmup, GOOGLE_API_KEY='',
+               VECTOR_DB_PATH=str(tmp_path / 'vector_db'),
+               EXTRACTION_CACHE_DIR=str(tmp_path / 'extraction_cache'))
+    out = subprocess.run([sys.executable, '-c', CHILD_CODE], cwd=str(tmp_path), env=env,
+                         capture_output=True, text=True, timeout=120, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_import_defers_heavy_modules_and_ready_starts_warm_up(tmp_path):
+    # RAG_WARMUP=0: import 직후 백그라운드 워밍업이 무거운 모듈을 로드하지 않으므로 결정적으로 확인 가능
+    result = _start(tmp_path, warmup='0')
+
+    assert result['loaded'] == []
+    assert result['health'] == 200
+    assert result['ready_first'] == 503
+    assert result['ready_last'] == 200
+
+
+def test_ready_after_startup_warm_up(tmp_path):
+    result = _start(tmp_path, warmup='1')
+
+    assert result['health'] == 200
+    assert result['ready_last'] == 200
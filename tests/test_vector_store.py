@@ -0,0 +1,117 @@
+import threading
+import numpy as np
+from langchain.schema import Document
+from vector_store import VectorStore
+
+
+def _batches(num_batches: int, batch_size: int, seed: int = 0):
+    """서로 다른 정규화 벡터로 채운 (문서, 임베딩) 배치 목록"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((num_batches * batch_size, 768)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    batches = []
+    for b in range(num_batches):
+        rows = vectors[b * batch_size:(b + 1) * batch_size]
+        documents = [Document(page_content=f"batch {b} chunk {i}", metadata={"batch": b, "chunk": i})
+                     for i in range(batch_size)]
+        batches.append((documents, rows))
+    return batches
+
+
+def _assert_self_search(store: VectorStore, batches):
+    """모든 청크가 자기 임베딩으로 검색했을 때 1위로 나와야 함"""
+    for documents, rows in batches:
+        for document, row in zip(documents, rows):
+            found, _, _ = store.search(row, 1)
+            assert found == [document.page_content]
+
+
+def test_concurrent_adds_keep_chunk_ids_and_shards_aligned(tmp_path):
+    store = VectorStore(str(tmp_path), num_shards=3)
+    batches = _batches(num_batches=40, batch_size=50)
+    barrier = threading.Barrier(len(batches))
+    errors = []
+
+    def add(documents, rows):
+        try:
+            barrier.wait()
+            store.add_documents(documents, rows)
+        except Exception as e:
+            errors.append(e)
+
+    def search_while_adding():
+        probe = batches[0][1][0]
+        while any(t.is_alive() for t in writers):
+            try:
+                store.search(probe, 5)
+            except Exception as e:
+                errors.append(e)
+
+    writers = [threading.Thread(target=add, args=batch) for batch in batches]
+    for t in writers:
+        t.start()
+    reader = threading.Thread(target=search_while_adding)
+    reader.start()
+    for t in writers:
+        t.join()
+    reader.join()
+
+    assert not errors
+    assert store.ntotal == len(store.documents) == 40 * 50
+    _assert_self_search(store, batches)
+    # 저장된 파일에서 다시 읽어도 같은 배치가 유지되어야 함
+    _assert_self_search(VectorStore(str(tmp_path), num_shards=3), batches)
+
+
+def test_reshard_keeps_chunk_ids(tmp_path):
+    batches = _batches(num_batches=5, batch_size=7)
+    store = VectorStore(str(tmp_path), num_shards=3)
+    for documents, rows in batches:
+        store.add_documents(documents, rows)
+
+    for num_shards in (1, 4):
+        _assert_self_search(VectorStore(str(tmp_path), num_shards=num_shards), batches)
+
+
+def test_searches_do_not_wait_for_disk_writes(tmp_path, monkeypatch):
+    import time
+    batches = _batches(num_batches=2, batch_size=5)
+    store = VectorStore(str(tmp_path))
+    store.add_documents(*batches[0])
+
+    writing = threading.Event()
+    write_snapshot = store._write_snapshot
+
+    def slow_write(*args):
+        writing.set()
+        time.sleep(1.0)
+        write_snapshot(*args)
+
+    monkeypatch.setattr(store, "_write_snapshot", slow_write)
+    writer = threading.Thread(target=store.add_documents, args=batches[1])
+    writer.start()
+    assert writing.wait(5)
+
+    start = time.perf_counter()
+    _assert_self_search(store, batches)
+    assert time.perf_counter() - start < 0.5
+    writer.join()
+    _assert_self_search(VectorStore(str(tmp_path)), batches)
+
+
+def test_failed_reshard_starts_empty_and_keeps_ids_aligned(tmp_path, monkeypatch):
+    batches = _batches(num_batches=3, batch_size=5)
+    store = VectorStore(str(tmp_path))
+    store.add_documents(*batches[0])
+
+    def fail(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(VectorStore, "_save_db", fail)
+    resharded = VectorStore(str(tmp_path), num_shards=2)
+    monkeypatch.undo()
+
+    assert (resharded.documents, resharded.metadata, resharded.doc_index, resharded.ntotal) == ([], [], {}, 0)
+    for documents, rows in batches[1:]:
+        resharded.add_documents(documents, rows)
+    _assert_self_search(resharded, batches[1:])
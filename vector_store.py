@@ -1,65 +1,234 @@
 import os
+import heapq
 import pickle
-import numpy as np
-import faiss
-from typing import List, Dict, Any, Tuple
-from langchain.schema import Document
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
 import logging
 
+# faiss, numpy는 인덱스를 실제로 다룰 때 import 한다 (콜드 스타트 단축)
+if TYPE_CHECKING:
+    from langchain.schema import Document
+
 # 로깅 설정
 logger = logging.getLogger(__name__)
 
+# 샤드 병렬 검색용 스레드 풀 (FAISS 검색은 GIL을 해제하므로 스레드로 코어를 나눠 쓸 수 있음)
+_search_executor = None
+_search_executor_lock = threading.Lock()
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    """모든 VectorStore가 공유하는 샤드 검색 스레드 풀 반환"""
+    global _search_executor
+    if _search_executor is None:
+        with _search_executor_lock:
+            if _search_executor is None:
+                _search_executor = ThreadPoolExecutor(
+                    max_workers=os.cpu_count() or 4,
+                    thread_name_prefix="faiss-shard"
+                )
+    return _search_executor
+
+class _ReadWriteLock:
+    """읽기는 동시에, 쓰기는 단독으로 허용하는 잠금 (쓰기가 대기 중이면 새 읽기는 기다림)"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
 class VectorStore:
     """FAISS 벡터 데이터베이스 관리 클래스"""
     
-    def __init__(self, db_path: str = "./vector_db"):
+    def __init__(self, db_path: str = "./vector_db", lazy_load: bool = False, num_shards: int = 1):
         """
         VectorStore 초기화
         
         Args:
             db_path: 벡터 DB 저장 경로
+            lazy_load: True이면 기존 DB를 첫 사용 시점(또는 load() 호출 시)에 로드
+            num_shards: 인덱스 샤드 수 (청크 id 기준 라운드 로빈 분배, 2 이상이면 샤드를 병렬 검색)
         """
+        if num_shards < 1:
+            raise ValueError(f"num_shards는 1 이상이어야 합니다: {num_shards}")
         self.db_path = db_path
-        self.index = None
+        self.num_shards = num_shards
+        # 청크 id g는 샤드 g % num_shards의 g // num_shards 번째 벡터
+        self.shards = []
         self.documents = []
         self.metadata = []
+        # 문서 내용 해시 -> 문서 통계 (중복 업로드 감지용, 청크 메타데이터에서 재구성)
+        self.doc_index = {}
+        self._text_bytes = 0
+        # 내용이 바뀔 때마다 새로 발급되는 코퍼스 버전 (질의 결과 공유 범위 구분용)
+        self.version = uuid.uuid4().hex
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        # 청크 id 발급, 샤드 추가, 문서 추가는 쓰기 잠금으로 직렬화하고 검색은 읽기 잠금으로 동시에 수행
+        self._rw_lock = _ReadWriteLock()
+        # 디스크 저장은 읽기 잠금으로 메모리 스냅샷만 뜬 뒤 별도 잠금 아래에서 수행 (쓰기 중에도 검색 가능)
+        self._save_lock = threading.Lock()
+        self._saved_version = None
         
         # DB 디렉토리 생성
         os.makedirs(db_path, exist_ok=True)
         
         # 기존 DB 로드 시도
-        self._load_existing_db()
+        if not lazy_load:
+            self.load()
+    
+    @property
+    def index(self):
+        """단일 샤드일 때의 FAISS 인덱스 (샤드가 여러 개면 None)"""
+        if len(self.shards) == 1:
+            return self.shards[0]
+        return None
+    
+    @property
+    def ntotal(self) -> int:
+        """전체 샤드의 벡터 수 합계"""
+        return sum(shard.ntotal for shard in self.shards)
+    
+    def _shard_path(self, shard_id: int, num_shards: int) -> str:
+        """샤드 인덱스 파일 경로 (단일 샤드는 기존 faiss_index.bin 그대로 사용)"""
+        if num_shards == 1:
+            return os.path.join(self.db_path, "faiss_index.bin")
+        return os.path.join(self.db_path, f"faiss_index_{shard_id}.bin")
+    
+    def _stored_shard_count(self) -> int:
+        """디스크에 저장된 샤드 수 (없으면 0)"""
+        if os.path.exists(self._shard_path(0, 1)):
+            return 1
+        count = 0
+        while os.path.exists(os.path.join(self.db_path, f"faiss_index_{count}.bin")):
+            count += 1
+        return count
+    
+    @property
+    def is_loaded(self) -> bool:
+        """인덱스 로드 완료 여부"""
+        return self._loaded
+    
+    def load(self):
+        """기존 DB를 로드 (이미 로드되었으면 아무 것도 하지 않음, 스레드 안전)"""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self._load_existing_db()
+                self._loaded = True
     
     def _load_existing_db(self):
         """기존 벡터 DB 로드"""
-        index_path = os.path.join(self.db_path, "faiss_index.bin")
+        import faiss
+        
+        stored_shards = self._stored_shard_count()
         docs_path = os.path.join(self.db_path, "documents.pkl")
         metadata_path = os.path.join(self.db_path, "metadata.pkl")
         
-        if (os.path.exists(index_path) and 
+        if (stored_shards > 0 and 
             os.path.exists(docs_path) and 
             os.path.exists(metadata_path)):
             try:
-                self.index = faiss.read_index(index_path)
+                self.shards = [faiss.read_index(self._shard_path(i, stored_shards))
+                               for i in range(stored_shards)]
                 with open(docs_path, 'rb') as f:
                     self.documents = pickle.load(f)
                 with open(metadata_path, 'rb') as f:
                     self.metadata = pickle.load(f)
-                logger.info(f"기존 벡터 DB 로드 완료: {len(self.documents)}개 문서")
+                self._text_bytes = sum(len(doc.encode('utf-8')) for doc in self.documents)
+                self.doc_index = {}
+                for doc, meta in zip(self.documents, self.metadata):
+                    self._index_chunk(doc, meta)
+                if stored_shards != self.num_shards:
+                    self._reshard(stored_shards)
+                logger.info(f"기존 벡터 DB 로드 완료: {len(self.documents)}개 문서, {self.num_shards}개 샤드")
             except Exception as e:
                 logger.error(f"기존 벡터 DB 로드 실패: {e}")
+                # 일부만 채워진 문서/메타데이터가 남으면 이후 추가되는 벡터와 청크 id가 어긋남
+                self._reset_documents()
                 self._initialize_new_index()
         else:
             self._initialize_new_index()
     
+    def _reset_documents(self):
+        """문서, 메타데이터, 문서 해시 색인 비우기"""
+        self.documents = []
+        self.metadata = []
+        self.doc_index = {}
+        self._text_bytes = 0
+    
     def _initialize_new_index(self):
         """새로운 FAISS 인덱스 초기화"""
+        import faiss
+        
         # 768은 Gemini 임베딩 차원
         dimension = 768
-        self.index = faiss.IndexFlatIP(dimension)  # Inner Product (cosine similarity)
-        logger.info(f"새로운 FAISS 인덱스 초기화 (차원: {dimension})")
+        # Inner Product (cosine similarity)
+        self.shards = [faiss.IndexFlatIP(dimension) for _ in range(self.num_shards)]
+        logger.info(f"새로운 FAISS 인덱스 초기화 (차원: {dimension}, 샤드: {self.num_shards})")
     
-    def add_documents(self, documents: List[Document], embeddings: List[List[float]]):
+    def _reshard(self, stored_shards: int):
+        """
+        저장된 샤드 수와 설정된 샤드 수가 다르면 벡터를 다시 분배
+        
+        Args:
+            stored_shards: 디스크에서 읽은 샤드 수
+        """
+        import faiss
+        import numpy as np
+        
+        old_shards = self.shards
+        total = sum(shard.ntotal for shard in old_shards)
+        dimension = old_shards[0].d
+        vectors = np.empty((total, dimension), dtype=np.float32)
+        for i, shard in enumerate(old_shards):
+            if shard.ntotal:
+                vectors[i::stored_shards] = shard.reconstruct_n(0, shard.ntotal)
+        
+        self.shards = []
+        for i in range(self.num_shards):
+            shard = faiss.IndexFlatIP(dimension)
+            shard.add(vectors[i::self.num_shards])
+            self.shards.append(shard)
+        logger.info(f"샤드 재분배: {stored_shards}개 -> {self.num_shards}개")
+        self._save_db()
+    
+    def add_documents(self, documents: List['Document'], embeddings: List[List[float]]):
         """
         문서와 임베딩을 벡터 DB에 추가
         
@@ -67,27 +236,67 @@ class VectorStore:
             documents: Document 객체 리스트
             embeddings: 임베딩 벡터 리스트
         """
+        import numpy as np
+        
+        self.load()
         try:
             # 임베딩을 numpy 배열로 변환
             embeddings_array = np.array(embeddings, dtype=np.float32)
             
-            # FAISS 인덱스에 추가
-            self.index.add(embeddings_array)
+            with self._rw_lock.write():
+                # FAISS 인덱스에 추가 (청크 id 순서대로 샤드에 라운드 로빈 분배)
+                start = len(self.documents)
+                for shard_id, shard in enumerate(self.shards):
+                    rows = embeddings_array[(shard_id - start) % self.num_shards::self.num_shards]
+                    if len(rows):
+                        shard.add(rows)
+                
+                # 문서와 메타데이터 저장
+                for doc in documents:
+                    self.documents.append(doc.page_content)
+                    self.metadata.append(doc.metadata)
+                    self._text_bytes += len(doc.page_content.encode('utf-8'))
+                    self._index_chunk(doc.page_content, doc.metadata)
+                self.version = uuid.uuid4().hex
+                
+                logger.info(f"벡터 DB에 {len(documents)}개 문서 추가 완료")
             
-            # 문서와 메타데이터 저장
-            for doc in documents:
-                self.documents.append(doc.page_content)
-                self.metadata.append(doc.metadata)
-            
-            logger.info(f"벡터 DB에 {len(documents)}개 문서 추가 완료")
-            
-            # DB 저장
-            self._save_db()
+            # DB 저장 (쓰기 잠금을 풀고 저장하므로 디스크에 쓰는 동안에도 검색 가능)
+            self._persist()
             
         except Exception as e:
             logger.error(f"문서 추가 실패: {e}")
             raise
     
+    def _index_chunk(self, text: str, meta: Dict[str, Any]):
+        """청크를 문서 해시 색인에 반영"""
+        content_hash = meta.get("content_hash")
+        if not content_hash:
+            return
+        entry = self.doc_index.setdefault(content_hash, {
+            "filename": meta.get("filename"),
+            "source": meta.get("source"),
+            "chunks": 0,
+            "total_tokens": 0
+        })
+        entry["chunks"] += 1
+        entry["total_tokens"] += len(text.split())
+    
+    def find_document(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        내용 해시로 이미 추가된 문서 조회
+        
+        Args:
+            content_hash: 문서 파일의 SHA-256 해시
+            
+        Returns:
+            문서 통계 (filename, source, chunks, total_tokens) 또는 None
+        """
+        self.load()
+        with self._rw_lock.read():
+            entry = self.doc_index.get(content_hash)
+            return dict(entry) if entry else None
+    
     def search(self, query_embedding: List[float], k: int = 5) -> Tuple[List[str], List[Dict[str, Any]], List[float]]:
         """
         쿼리 임베딩과 유사한 문서 검색
@@ -99,26 +308,34 @@ class VectorStore:
         Returns:
             (문서 내용 리스트, 메타데이터 리스트, 유사도 점수 리스트)
         """
+        import numpy as np
+        
+        self.load()
         try:
-            if self.index is None or self.index.ntotal == 0:
-                logger.warning("FAISS 인덱스가 비어 있습니다. 문서를 먼저 추가하세요.")
-                return [], [], []
-            # 쿼리 임베딩을 numpy 배열로 변환
-            query_array = np.array([query_embedding], dtype=np.float32)
-            
-            # FAISS 검색
-            scores, indices = self.index.search(query_array, k)
-            
-            # 결과 추출
-            documents = []
-            metadata_list = []
-            similarity_scores = []
-            
-            for i, score in zip(indices[0], scores[0]):
-                if i < len(self.documents):  # 유효한 인덱스인지 확인
-                    documents.append(self.documents[i])
-                    metadata_list.append(self.metadata[i])
-                    similarity_scores.append(float(score))
+            with self._rw_lock.read():
+                if not self.shards or self.ntotal == 0:
+                    logger.warning("FAISS 인덱스가 비어 있습니다. 문서를 먼저 추가하세요.")
+                    return [], [], []
+                # 쿼리 임베딩을 numpy 배열로 변환
+                query_array = np.array([query_embedding], dtype=np.float32)
+                
+                # FAISS 검색
+                if self.num_shards == 1:
+                    scores, indices = self.shards[0].search(query_array, k)
+                    hits = list(zip(scores[0], indices[0]))
+                else:
+                    hits = self._search_shards(query_array, k)
+                
+                # 결과 추출
+                documents = []
+                metadata_list = []
+                similarity_scores = []
+                
+                for score, i in hits:
+                    if 0 <= i < len(self.documents):  # 유효한 인덱스인지 확인
+                        documents.append(self.documents[i])
+                        metadata_list.append(self.metadata[i])
+                        similarity_scores.append(float(score))
             
             logger.info(f"검색 완료: {len(documents)}개 문서 반환")
             return documents, metadata_list, similarity_scores
@@ -127,22 +344,84 @@ class VectorStore:
             logger.error(f"검색 실패: {e}")
             raise
     
+    def _search_shards(self, query_array, k: int) -> List[Tuple[float, int]]:
+        """
+        모든 샤드를 병렬로 검색하고 상위 k개를 힙으로 병합
+        
+        Args:
+            query_array: (1, 차원) 쿼리 배열
+            k: 반환할 문서 수
+            
+        Returns:
+            (유사도 점수, 청크 id) 리스트 (점수 내림차순)
+        """
+        def search_shard(shard_id: int):
+            shard = self.shards[shard_id]
+            shard_k = min(k, shard.ntotal)
+            if shard_k == 0:
+                return []
+            scores, indices = shard.search(query_array, shard_k)
+            return [(float(score), int(local) * self.num_shards + shard_id)
+                    for score, local in zip(scores[0], indices[0]) if local >= 0]
+        
+        executor = _get_search_executor()
+        results = executor.map(search_shard, range(self.num_shards))
+        return heapq.nlargest(k, (hit for shard_hits in results for hit in shard_hits),
+                              key=lambda hit: hit[0])
+    
+    def _snapshot(self):
+        """저장할 인덱스, 문서, 메타데이터를 메모리에서 직렬화 (읽기 잠금 이상을 보유한 상태에서 호출)"""
+        import faiss
+        
+        return ([faiss.serialize_index(shard) for shard in self.shards],
+                pickle.dumps(self.documents),
+                pickle.dumps(self.metadata))
+    
+    def _persist(self):
+        """
+        현재 상태를 디스크에 저장
+        
+        읽기 잠금은 메모리 직렬화 동안만 잡고 파일 쓰기는 저장 잠금 아래에서 수행.
+        대기하는 동안 다른 저장이 이미 같은 버전을 썼으면 건너뜀
+        """
+        with self._save_lock:
+            with self._rw_lock.read():
+                version = self.version
+                if version == self._saved_version:
+                    return
+                snapshot = self._snapshot()
+            self._write_snapshot(*snapshot)
+            self._saved_version = version
+    
     def _save_db(self):
-        """벡터 DB를 파일로 저장"""
+        """벡터 DB를 파일로 저장 (다른 스레드가 접근하지 않는 로드/재분배 중에 사용)"""
+        self._write_snapshot(*self._snapshot())
+    
+    def _write_snapshot(self, shard_data, documents_data: bytes, metadata_data: bytes):
+        """직렬화한 인덱스, 문서, 메타데이터를 파일로 저장"""
         try:
-            # FAISS 인덱스 저장
-            index_path = os.path.join(self.db_path, "faiss_index.bin")
-            faiss.write_index(self.index, index_path)
+            # FAISS 인덱스 저장 (샤드별 파일)
+            for shard_id, data in enumerate(shard_data):
+                with open(self._shard_path(shard_id, self.num_shards), 'wb') as f:
+                    data.tofile(f)
+            
+            # 이전 샤드 구성의 남은 파일 정리
+            if self.num_shards > 1 and os.path.exists(self._shard_path(0, 1)):
+                os.remove(self._shard_path(0, 1))
+            stale_id = 0 if self.num_shards == 1 else self.num_shards
+            while os.path.exists(os.path.join(self.db_path, f"faiss_index_{stale_id}.bin")):
+                os.remove(os.path.join(self.db_path, f"faiss_index_{stale_id}.bin"))
+                stale_id += 1
             
             # 문서 저장
             docs_path = os.path.join(self.db_path, "documents.pkl")
             with open(docs_path, 'wb') as f:
-                pickle.dump(self.documents, f)
+                f.write(documents_data)
             
             # 메타데이터 저장
             metadata_path = os.path.join(self.db_path, "metadata.pkl")
             with open(metadata_path, 'wb') as f:
-                pickle.dump(self.metadata, f)
+                f.write(metadata_data)
             
             logger.info("벡터 DB 저장 완료")
             
@@ -152,16 +431,36 @@ class VectorStore:
     
     def get_stats(self) -> Dict[str, Any]:
         """벡터 DB 통계 정보 반환"""
-        return {
-            "total_documents": len(self.documents),
-            "index_size": self.index.ntotal if self.index else 0,
-            "db_path": self.db_path
-        }
+        self.load()
+        with self._rw_lock.read():
+            return {
+                "total_documents": len(self.documents),
+                "index_size": self.ntotal,
+                "num_shards": self.num_shards,
+                "db_path": self.db_path
+            }
+    
+    def memory_usage(self) -> int:
+        """메모리 사용량 추정치 (바이트): 인덱스 벡터 + 청크 텍스트"""
+        if not self._loaded or not self.shards:
+            return 0
+        return self.ntotal * self.shards[0].d * 4 + self._text_bytes
+    
+    def disk_usage(self) -> int:
+        """디스크 사용량 (바이트): 인덱스, 문서, 메타데이터 파일 합계"""
+        total = 0
+        for name in os.listdir(self.db_path):
+            if name.startswith("faiss_index") or name in ("documents.pkl", "metadata.pkl"):
+                total += os.path.getsize(os.path.join(self.db_path, name))
+        return total
     
     def clear(self):
         """벡터 DB 초기화"""
-        self._initialize_new_index()
-        self.documents = []
-        self.metadata = []
-        self._save_db()
+        with self._rw_lock.write():
+            with self._load_lock:
+                self._initialize_new_index()
+                self._reset_documents()
+                self.version = uuid.uuid4().hex
+                self._loaded = True
+        self._persist()
         logger.info("벡터 DB 초기화 완료") 
\ No newline at end of file